@@ -1,11 +1,14 @@
 import asyncio
 import base64
+import importlib.util
 import os
+from functools import lru_cache
 from typing import List, Type, Dict, Any, Tuple
-import json
 import uuid
 from pathlib import Path
 
+import httpx
+import orjson
 from pydantic import BaseModel
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception
 
@@ -20,10 +23,31 @@ from info_extraction.extraction_payload import (
     EXTRACTION_SCHEMAS,
 )
 
-from utils.utils import merge_multiple_dicts_async
+from utils.utils import merge_dicts
 from time import monotonic
 
 _OCR_RPS = float(os.getenv("OCR_RPS", "5"))
+_HTTP_TIMEOUT_S = float(os.getenv("HTTP_TIMEOUT_S", "120"))
+_HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "64"))
+
+
+def make_http_client() -> httpx.AsyncClient:
+    """
+    One pooled httpx client shared by every OCR/files request.
+
+    HTTP/2 multiplexes the concurrent chunk requests over a single connection
+    when the optional `h2` package is installed (`httpx[http2]`); otherwise the
+    pool keeps HTTP/1.1 connections alive between requests.
+    """
+    http2 = importlib.util.find_spec("h2") is not None
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=_HTTP_MAX_CONNECTIONS // 2,
+        ),
+        timeout=httpx.Timeout(_HTTP_TIMEOUT_S),
+    )
 
 
 class _AsyncRateLimiter:
@@ -47,7 +71,17 @@ class _AsyncRateLimiter:
 _rate_limiter = _AsyncRateLimiter(_OCR_RPS)
 
 
-# ---------------- core OCR call (sync) ----------------
+# ---------------- core OCR call ----------------
+@lru_cache(maxsize=None)
+def _response_format(payload_cls: Type[BaseModel]):
+    """JSON-schema response format for a payload class, built once per class.
+
+    Schema generation walks the whole model on every call and the schemas are
+    static, so every OCR request for the same class can share one object.
+    """
+    return response_format_from_pydantic_model(payload_cls)
+
+
 _RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
 
 
@@ -94,13 +128,14 @@ def _render_pages_to_images(
     wait=wait_exponential(multiplier=1, min=4, max=120),
     retry=retry_if_exception(_is_retryable),
 )
-def _get_annotation_sync(
+async def _get_annotation(
     client: Mistral,
     payload_cls: Type[BaseModel],
-    base64_pdf: str,
+    base64_pdf: str | None,
     pages: List[int],
     image_annotation: bool = False,
     model_name: str = "mistral-ocr-latest",
+    document_url: str | None = None,
 ) -> OCRResponse | None:
     if not pages:
         logger.warning("OCR called with empty pages. Skipping.")
@@ -112,18 +147,19 @@ def _get_annotation_sync(
         "pages": pages,
         "document": {
             "type": "document_url",
-            "document_url": f"data:application/pdf;base64,{base64_pdf}",
+            # uploaded PDFs are referenced by signed URL, otherwise sent inline
+            "document_url": document_url or f"data:application/pdf;base64,{base64_pdf}",
         },
-        "document_annotation_format": response_format_from_pydantic_model(payload_cls),
+        "document_annotation_format": _response_format(payload_cls),
         # keep image bytes off to avoid huge payloads by default
         "include_image_base64": False,
     }
 
     if image_annotation:
-        kwargs["bbox_annotation_format"] = response_format_from_pydantic_model(Image)
+        kwargs["bbox_annotation_format"] = _response_format(Image)
 
     try:
-        return client.ocr.process(**kwargs)
+        return await client.ocr.process_async(**kwargs)
     except Exception as e:
         if _is_retryable(e):
             raise
@@ -137,7 +173,7 @@ def _get_annotation_sync(
     wait=wait_exponential(multiplier=1, min=4, max=120),
     retry=retry_if_exception(_is_retryable),
 )
-def _get_annotation_from_image_sync(
+async def _get_annotation_from_image(
     client: Mistral,
     payload_cls: Type[BaseModel],
     base64_image: str,
@@ -151,11 +187,11 @@ def _get_annotation_from_image_sync(
             "type": "image_url",
             "image_url": f"data:image/png;base64,{base64_image}",
         },
-        "document_annotation_format": response_format_from_pydantic_model(payload_cls),
+        "document_annotation_format": _response_format(payload_cls),
         "include_image_base64": False,
     }
     try:
-        return client.ocr.process(**kwargs)
+        return await client.ocr.process_async(**kwargs)
     except Exception as e:
         if _is_retryable(e):
             raise
@@ -163,27 +199,28 @@ def _get_annotation_from_image_sync(
         return None
 
 
-# ---------------- async thin wrapper ----------------
+# ---------------- rate-limited wrapper with image fallback ----------------
 
 
 async def get_annotation_async(
     client: Mistral,
     payload_cls: Type[BaseModel],
-    base64_pdf: str,
+    base64_pdf: str | None,
     pages: List[int],
     image_annotation: bool = False,
     model_name: str = "mistral-ocr-latest",
     pdf_path: str | Path | None = None,
+    document_url: str | None = None,
 ) -> OCRResponse | None:
     await _rate_limiter.wait()
-    result = await asyncio.to_thread(
-        _get_annotation_sync,
+    result = await _get_annotation(
         client,
         payload_cls,
         base64_pdf,
         pages,
         image_annotation,
         model_name,
+        document_url,
     )
 
     # If PDF-based OCR returned None and we have a PDF path, try image fallback
@@ -203,13 +240,7 @@ async def get_annotation_async(
         for b64_img in base64_images:
             await _rate_limiter.wait()
             image_tasks.append(
-                asyncio.to_thread(
-                    _get_annotation_from_image_sync,
-                    client,
-                    payload_cls,
-                    b64_img,
-                    model_name,
-                )
+                _get_annotation_from_image(client, payload_cls, b64_img, model_name)
             )
         image_results = await asyncio.gather(*image_tasks, return_exceptions=True)
 
@@ -222,21 +253,63 @@ async def get_annotation_async(
     return result
 
 
+# ---------------- upload once, reference from every request ----------------
+
+
+async def upload_pdf(client: Mistral, pdf_path: str | Path) -> Tuple[str, str] | None:
+    """
+    Upload a PDF to Mistral file storage and return (file_id, signed_url).
+
+    Every chunk x schema request for the PDF then references the signed URL
+    instead of re-sending the whole document as base64. Returns None on any
+    failure so the caller can fall back to an inline data URI.
+    """
+    path = Path(pdf_path)
+    try:
+        content = await asyncio.to_thread(path.read_bytes)
+        uploaded = await client.files.upload_async(
+            file={"file_name": path.name, "content": content}, purpose="ocr"
+        )
+    except Exception as e:
+        logger.warning(f"Upload failed for {path.name}, sending inline: {e}")
+        return None
+
+    try:
+        signed = await client.files.get_signed_url_async(file_id=uploaded.id)
+    except Exception as e:
+        logger.warning(f"Signed URL failed for {path.name}, sending inline: {e}")
+        await delete_uploaded_pdf(client, uploaded.id)
+        return None
+    return uploaded.id, signed.url
+
+
+async def delete_uploaded_pdf(client: Mistral, file_id: str) -> None:
+    """Remove an uploaded PDF so Mistral file storage stays bounded."""
+    try:
+        await client.files.delete_async(file_id=file_id)
+    except Exception as e:
+        logger.warning(f"Could not delete uploaded file {file_id}: {e}")
+
+
 # ---------------- convenience: run all payload schemas ----------------
 
 
 async def run_all_payloads(
     client: Mistral,
-    base64_pdf: str,
+    base64_pdf: str | None,
     pages: List[int],
     image_annotation: bool = False,
     model_name: str = "mistral-ocr-latest",
     pdf_path: str | Path | None = None,
-) -> Tuple[Dict[str, Any], OCRResponse]:
+    document_url: str | None = None,
+) -> Tuple[Dict[str, Any], OCRResponse, int]:
     """
     Executes OCR with all payload schemas and merges the
     document_annotation JSON objects into one flat dict.
+    Also returns how many schema calls failed; the merged dict then lacks
+    their fields, so callers should not cache it as a finished chunk.
 
+    If document_url is given (see upload_pdf) it is used instead of base64_pdf.
     If pdf_path is provided and PDF-based OCR fails (e.g., "not a valid PDF"),
     falls back to rendering pages as images and using image-based OCR.
     """
@@ -251,29 +324,34 @@ async def run_all_payloads(
             image_annotation=image_annotation,
             model_name=model_name,
             pdf_path=pdf_path,
+            document_url=document_url,
         )
         for cls in payload_classes
     ]
     raw_responses = await asyncio.gather(*tasks, return_exceptions=True)
 
-    merged: Dict[str, Any] = {}
+    annotations: List[Dict[str, Any]] = []
     last_resp = None
+    failed = 0
     for resp in raw_responses:
         if isinstance(resp, BaseException):
             logger.error(f"OCR schema task failed: {resp}")
+            failed += 1
             continue
         if not resp:
+            failed += 1
             continue
         last_resp = resp
 
-        resp_dict = json.loads(resp.model_dump_json())
-        doc_anno_obj = resp_dict.get("document_annotation") or {}
+        # only the annotation is needed; skip dumping/re-parsing the whole response
+        doc_anno_obj = resp.document_annotation or {}
         if isinstance(doc_anno_obj, str):
             try:
-                doc_anno_obj = json.loads(doc_anno_obj)
+                doc_anno_obj = orjson.loads(doc_anno_obj)
             except Exception:
                 doc_anno_obj = {}
 
-        merged = await merge_multiple_dicts_async([merged, doc_anno_obj])
+        annotations.append(doc_anno_obj)
 
-    return merged, last_resp
+    # merging is pure CPU work, so it runs inline in one call
+    return merge_dicts(annotations), last_resp, failed
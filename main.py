@@ -2,7 +2,9 @@ import os
 import re
 import json
 import asyncio
-from time import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from time import monotonic, time
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -13,16 +15,25 @@ from mistralai import Mistral
 from rich.traceback import install
 
 from info_extraction.to_markdown import convert_to_markdown
-from info_extraction.get_annotations import run_all_payloads
+from info_extraction.get_annotations import (
+    run_all_payloads,
+    upload_pdf,
+    delete_uploaded_pdf,
+    make_http_client,
+)
 from info_extraction.extraction_payload import df_cols_from_models
 from utils.utils import (
     encode_pdf,
     get_pdf_page_count,
-    merge_multiple_dicts_async,
+    merge_dicts,
     file_name_sha1,
     load_existing_index,
-    append_csv_row,
+    CsvAppender,
     ParquetAppender,
+    read_chunk_meta,
+    write_chunk_meta,
+    load_page_counts,
+    save_page_counts,
 )
 
 install(show_locals=False)
@@ -33,11 +44,34 @@ OUTPUT_DIR = Path("output")
 FINAL_OUTPUT_DIR = OUTPUT_DIR / "aggregated"
 OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
 FINAL_OUTPUT_DIR.mkdir(exist_ok=True, parents=True)
+# References-page scan results, reused while a PDF's mtime and size are unchanged
+PAGE_COUNTS_PATH = OUTPUT_DIR / "page_counts.json"
 
-MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "3"))
+# OCR calls are native async, so the provider rate limit (OCR_RPS) is the
+# real ceiling rather than a thread per request
+MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "16"))
+MAX_PENDING_PDFS = int(os.getenv("MAX_PENDING_PDFS", str(MAX_CONCURRENCY * 4)))
 MAX_PAGES_PER_REQ = 8
 IMAGE_ANNOTATION = os.getenv("IMAGE_ANNOTATION", "False").lower() == "true"
 OVERWRITE_MD = os.getenv("OVERWRITE_MD", "True").lower() == "true"
+# "thread" renders markdown via asyncio.to_thread, "process" uses a process pool
+MD_PARALLEL = os.getenv("MD_PARALLEL", "thread").lower()
+# resume reuses a chunk only if its markdown is larger than this
+MIN_MD_BYTES = int(os.getenv("MIN_MD_BYTES", "64"))
+# upload each PDF once and reference it by signed URL instead of sending
+# base64 with every chunk x schema request
+UPLOAD_PDFS = os.getenv("UPLOAD_PDFS", "True").lower() == "true"
+# Parquet is the primary output (and resume index); CSV is optional
+EXPORT_CSV = os.getenv("EXPORT_CSV", "False").lower() == "true"
+# rows buffered per Parquet row group; the output is replaced only when the run
+# ends cleanly, so a killed or failed run keeps the previous file and its PDFs
+# are redone on resume
+PARQUET_BATCH_ROWS = int(os.getenv("PARQUET_BATCH_ROWS", "1024"))
+# tqdm redraws the terminal on every PDF; by default progress is a log line
+# emitted at most every PROGRESS_EVERY_S seconds or PROGRESS_EVERY_N PDFs
+PROGRESS_BAR = os.getenv("PROGRESS_BAR", "False").lower() == "true"
+PROGRESS_EVERY_S = 1.0
+PROGRESS_EVERY_N = 100
 
 logger.remove()
 logger.add(
@@ -58,30 +92,66 @@ logger.add(
 )
 
 
+def _chunk_md_path(pdf_path: Path, chunk_start: int) -> Path:
+    safe_stem = re.sub(r"[^\w\-]", "_", pdf_path.stem)
+    return OUTPUT_DIR / f"{safe_stem}_{chunk_start // MAX_PAGES_PER_REQ}.md"
+
+
+def _read_cached_chunks(
+    pdf_path: Path, pages: int, source_key: str
+) -> list[dict] | None:
+    """Return the cached rows for every chunk of the PDF, or None on any miss."""
+    rows = []
+    for start in range(0, pages, MAX_PAGES_PER_REQ):
+        row = read_chunk_meta(
+            _chunk_md_path(pdf_path, start), source_key, start, MIN_MD_BYTES
+        )
+        if row is None:
+            return None
+        rows.append(row)
+    return rows
+
+
 async def process_one_pdf_chunk(
     pdf_path: Path,
-    base64_pdf: str,
+    base64_pdf: str | None,
     client: Mistral,
     sem: asyncio.Semaphore,
     pages_chunk: list[int],
     image_annotation: bool = False,
+    md_pool: ProcessPoolExecutor | None = None,
+    document_url: str | None = None,
 ) -> dict | None:
     """Process a single PDF:
     - encode PDF
     - call OCR with annotations (offloaded)
     - write markdown
-    - return normalized dict for DataFrame row
+    - return normalized dict for DataFrame row, or None if the OCR call or any
+      schema call failed
     """
     chunk_start = pages_chunk[0]
+    source_key = file_name_sha1(pdf_path.name)
+    out_md = _chunk_md_path(pdf_path, chunk_start)
+
+    # 0) Resume: reuse chunks finished by an earlier (partially failed) run
+    if not OVERWRITE_MD:
+        cached = await asyncio.to_thread(
+            read_chunk_meta, out_md, source_key, chunk_start, MIN_MD_BYTES
+        )
+        if cached is not None:
+            logger.debug(f"Reusing cached chunk {out_md.name} for {pdf_path.name}")
+            return cached
+
     async with sem:
         # 1) OCR call (blocking network)
         try:
-            annotations_response, ocr_response = await run_all_payloads(
+            annotations_response, ocr_response, failed = await run_all_payloads(
                 client,
                 base64_pdf,
                 pages=pages_chunk,
                 image_annotation=image_annotation,
                 pdf_path=pdf_path,
+                document_url=document_url,
             )
         except Exception as e:
             logger.error(f"OCR failed for {pdf_path.name}: {e}")
@@ -90,25 +160,45 @@ async def process_one_pdf_chunk(
         # 2) Parse annotations -> dict row
         try:
             document_annotations = annotations_response
-            row = {k: document_annotations.get(k) for k in document_annotations.keys()}
+            row = dict(document_annotations)
         except Exception as e:
             logger.error(f"Failed to parse annotations for {pdf_path.name}: {e}")
             row = None
 
         # 3) Write markdown to file
-        safe_stem = re.sub(r"[^\w\-]", "_", pdf_path.stem)
-        out_md = (
-            OUTPUT_DIR / f"{safe_stem}_{int(min(pages_chunk) / MAX_PAGES_PER_REQ)}.md"
-        )
-        if ocr_response is not None and (not Path(out_md).exists() or OVERWRITE_MD):
+        if ocr_response is not None and (OVERWRITE_MD or not out_md.exists()):
             try:
-                await asyncio.to_thread(
-                    convert_to_markdown, document_annotations, ocr_response, str(out_md)
-                )
+                if md_pool is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        md_pool,
+                        convert_to_markdown,
+                        document_annotations,
+                        ocr_response,
+                        str(out_md),
+                    )
+                else:
+                    await asyncio.to_thread(
+                        convert_to_markdown,
+                        document_annotations,
+                        ocr_response,
+                        str(out_md),
+                    )
             except Exception as e:
                 logger.error(f"Writing markdown failed for {pdf_path.name}: {e}")
 
-        return {"__chunk_start__": chunk_start, **(row or {})}
+        # 4) Record completion so a rerun can skip this chunk; a chunk with
+        # failed schema calls is left for the rerun to retry
+        if failed:
+            logger.warning(
+                f"{failed} schema call(s) failed for {out_md.name}; not caching it"
+            )
+            return None
+        if row is not None and out_md.exists():
+            await asyncio.to_thread(
+                write_chunk_meta, out_md, source_key, chunk_start, row
+            )
+
+        return row or {}
 
 
 def _postprocess_row(row: dict) -> dict:
@@ -164,61 +254,106 @@ async def process_one_pdf(
     client: Mistral,
     sem: asyncio.Semaphore,
     image_annotation: bool = False,
+    md_pool: ProcessPoolExecutor | None = None,
 ) -> dict | None:
-    pages = await get_pdf_page_count(pdf_path)
+    # the References scan is CPU-bound, so it shares the markdown process pool
+    pages = await get_pdf_page_count(pdf_path, md_pool)
 
     if pages <= 0:
         return None
 
-    base64_pdf = await encode_pdf(pdf_path)
-    if not base64_pdf:
-        logger.warning(f"Skipping {pdf_path.name}: could not base64 encode.")
-        return None
+    # resume id of this PDF, shared by the sidecar check and the output row
+    source_key = file_name_sha1(pdf_path.name)
 
-    if pages <= MAX_PAGES_PER_REQ:
-        result = await process_one_pdf_chunk(
-            pdf_path, base64_pdf, client, sem, list(range(pages)), image_annotation
+    # Every chunk finished in an earlier run: no upload, encode or OCR needed
+    if not OVERWRITE_MD:
+        cached = await asyncio.to_thread(
+            _read_cached_chunks, pdf_path, pages, source_key
         )
-        if result is None:
+        if cached is not None:
+            logger.debug(f"Reusing {len(cached)} cached chunk(s) for {pdf_path.name}")
+            row = merge_dicts(cached)
+            row["__source_file__"] = source_key
+            return _postprocess_row(row)
+
+    # Upload once; every chunk x schema request then references the same file
+    uploaded = await upload_pdf(client, pdf_path) if UPLOAD_PDFS else None
+    document_url = uploaded[1] if uploaded else None
+    base64_pdf = None
+    if document_url is None:
+        base64_pdf = await encode_pdf(pdf_path)
+        if not base64_pdf:
+            logger.warning(f"Skipping {pdf_path.name}: could not base64 encode.")
             return None
-        result = {k: v for k, v in result.items() if k != "__chunk_start__"}
-        result["__source_file__"] = str(file_name_sha1(pdf_path.name))
-        return _postprocess_row(result)
 
-    chunk_tasks = []
-    for start in range(0, pages, MAX_PAGES_PER_REQ):
-        end = min(start + MAX_PAGES_PER_REQ, pages)
-        chunk_tasks.append(
-            process_one_pdf_chunk(
+    try:
+        if pages <= MAX_PAGES_PER_REQ:
+            result = await process_one_pdf_chunk(
                 pdf_path,
                 base64_pdf,
                 client,
                 sem,
-                list(range(start, end)),
+                list(range(pages)),
                 image_annotation,
+                md_pool,
+                document_url,
+            )
+            if result is None:
+                return None
+            result["__source_file__"] = source_key
+            return _postprocess_row(result)
+
+        chunk_tasks = []
+        for start in range(0, pages, MAX_PAGES_PER_REQ):
+            end = min(start + MAX_PAGES_PER_REQ, pages)
+            chunk_tasks.append(
+                process_one_pdf_chunk(
+                    pdf_path,
+                    base64_pdf,
+                    client,
+                    sem,
+                    list(range(start, end)),
+                    image_annotation,
+                    md_pool,
+                    document_url,
+                )
             )
-        )
-
-    chunk_results = []
-    for fut in asyncio.as_completed(chunk_tasks):
-        r = await fut
-        if r is not None:
-            chunk_results.append(r)
-
-    # sort by earliest pages
-    chunk_results.sort(key=lambda d: d.get("__chunk_start__", 10**3))
-
-    # strip helper key
-    rows = [
-        {k: v for k, v in d.items() if k != "__chunk_start__"} for d in chunk_results
-    ]
 
-    merged = await merge_multiple_dicts_async(rows)
-    merged["__source_file__"] = str(file_name_sha1(pdf_path.name))
+        # gather keeps page order, so chunks merge earliest-first
+        results = await asyncio.gather(*chunk_tasks, return_exceptions=True)
+    finally:
+        if uploaded:
+            await delete_uploaded_pdf(client, uploaded[0])
+
+    # a partial row would mark the PDF done; without it the resume pass redoes
+    # only the chunks that have no sidecar
+    rows = []
+    failed_chunks = 0
+    for r in results:
+        if isinstance(r, BaseException):
+            logger.error(f"Chunk failed for {pdf_path.name}: {r}")
+            failed_chunks += 1
+        elif r is None:
+            failed_chunks += 1
+        else:
+            rows.append(r)
+    if failed_chunks:
+        logger.warning(
+            f"{failed_chunks} chunk(s) failed for {pdf_path.name}; retried on resume"
+        )
+        return None
+    merged = merge_dicts(rows)
+    merged["__source_file__"] = source_key
     return _postprocess_row(merged)
 
 
 async def amain():
+    md_pool = (
+        ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) - 1))
+        if MD_PARALLEL == "process"
+        else None
+    )
+    load_page_counts(PAGE_COUNTS_PATH)
     try:
         api_key = os.getenv("MISTRAL_API_KEY")
         if not api_key:
@@ -240,11 +375,17 @@ async def amain():
                     except Exception as e:
                         logger.warning(f"Could not delete {file}: {e}")
 
-        # Resume index: skip files that already exist in CSV if OVERWRITE_MD is False
-        already_processed = load_existing_index(csv_path) if not OVERWRITE_MD else set()
+        # Resume index: skip files already in the Parquet output if OVERWRITE_MD is False
+        already_processed = (
+            load_existing_index(parquet_path) if not OVERWRITE_MD else frozenset()
+        )
         columns = [*df_cols_from_models(), "__source_file__"]
 
-        async with Mistral(api_key=api_key) as client:
+        # Mistral leaves a supplied client open, so it gets its own context
+        async with (
+            make_http_client() as http_client,
+            Mistral(api_key=api_key, async_client=http_client) as client,
+        ):
             list_of_pdfs = list(INPUT_DIR.glob("*.pdf"))
             if not list_of_pdfs:
                 logger.error(f"No PDFs found in {INPUT_DIR}")
@@ -266,51 +407,96 @@ async def amain():
             )
 
             sem = asyncio.Semaphore(MAX_CONCURRENCY)
+            # caps PDFs in flight (running or waiting on the writer) so memory
+            # stays flat regardless of corpus size
+            slot = asyncio.Semaphore(MAX_PENDING_PDFS)
+            queue: asyncio.Queue[tuple[Path, dict | None] | None] = asyncio.Queue()
             start_time = time()
             failures_path = FINAL_OUTPUT_DIR / "failures.jsonl"
 
-            # launch all tasks paired with their PDF path
-            async def _run(p: Path) -> tuple[Path, dict | None]:
-                result = await process_one_pdf(
-                    p, client, sem, image_annotation=IMAGE_ANNOTATION
-                )
-                return p, result
-
-            tasks = [_run(p) for p in todo]
-
-            row_count = 0
-            fail_count = 0
-            with ParquetAppender(parquet_path) as pw:
-                for fut in tqdm(
-                    asyncio.as_completed(tasks),
-                    total=len(tasks),
-                    desc="Processing PDFs",
-                ):
-                    pdf_path, result = await fut
-                    if result is not None:
-                        # offload the blocking disk writes
-                        await asyncio.to_thread(
-                            append_csv_row, csv_path, result, columns
-                        )
-                        await asyncio.to_thread(pw.append, result)
-
-                        row_count += 1
-                        logger.debug(
-                            f"row appended ({row_count}) -> {result.get('__source_file__')}"
+            async def _bounded(p: Path) -> None:
+                try:
+                    try:
+                        result = await process_one_pdf(
+                            p,
+                            client,
+                            sem,
+                            image_annotation=IMAGE_ANNOTATION,
+                            md_pool=md_pool,
                         )
-                    else:
-                        fail_count += 1
-                        logger.warning(f"Failed: {pdf_path.name}")
-                        with open(failures_path, "a", encoding="utf-8") as fj:
-                            fj.write(
-                                json.dumps(
-                                    {"file": str(pdf_path.name), "time": time()},
-                                    ensure_ascii=False,
+                    except Exception as e:
+                        logger.error(f"Processing failed for {p.name}: {e}")
+                        result = None
+                    await queue.put((p, result))
+                finally:
+                    slot.release()
+
+            async def _drain(
+                pw: ParquetAppender, cw: CsvAppender | None
+            ) -> tuple[int, int]:
+                def _write(row: dict) -> None:
+                    pw.append(row)
+                    if cw is not None:
+                        cw.append(row)
+
+                row_count = 0
+                fail_count = 0
+                total = len(todo)
+                last_log, last_done = monotonic(), 0
+                with tqdm(
+                    total=total, desc="Processing PDFs", disable=not PROGRESS_BAR
+                ) as bar:
+                    while (item := await queue.get()) is not None:
+                        pdf_path, result = item
+                        if result is not None:
+                            # offload the blocking disk writes
+                            await asyncio.to_thread(_write, result)
+
+                            row_count += 1
+                            logger.debug(
+                                f"row appended ({row_count}) -> {result.get('__source_file__')}"
+                            )
+                        else:
+                            fail_count += 1
+                            logger.warning(f"Failed: {pdf_path.name}")
+                            with open(failures_path, "a", encoding="utf-8") as fj:
+                                fj.write(
+                                    json.dumps(
+                                        {"file": str(pdf_path.name), "time": time()},
+                                        ensure_ascii=False,
+                                    )
+                                    + "\n"
                                 )
-                                + "\n"
+                        bar.update(1)
+
+                        done = row_count + fail_count
+                        now = monotonic()
+                        if not PROGRESS_BAR and (
+                            done == total
+                            or now - last_log >= PROGRESS_EVERY_S
+                            or done - last_done >= PROGRESS_EVERY_N
+                        ):
+                            logger.info(
+                                f"{done}/{total} PDFs done ({fail_count} failed)"
                             )
+                            last_log, last_done = now, done
+                return row_count, fail_count
 
-        logger.info(f"Saved {row_count} rows to {parquet_path} and {csv_path}")
+            with (
+                ParquetAppender(parquet_path, PARQUET_BATCH_ROWS, columns) as pw,
+                CsvAppender(csv_path, columns) if EXPORT_CSV else nullcontext() as cw,
+            ):
+                async with asyncio.TaskGroup() as tg:
+                    writer = tg.create_task(_drain(pw, cw))
+                    async with asyncio.TaskGroup() as producers:
+                        for p in todo:
+                            await slot.acquire()
+                            producers.create_task(_bounded(p))
+                    await queue.put(None)
+                row_count, fail_count = writer.result()
+
+        saved_to = f"{parquet_path} and {csv_path}" if EXPORT_CSV else parquet_path
+        logger.info(f"Saved {row_count} rows to {saved_to}")
         if fail_count:
             logger.warning(f"{fail_count} PDFs failed — see {failures_path}")
         logger.info(f"Time taken: {time() - start_time:.2f} seconds")
@@ -318,6 +504,10 @@ async def amain():
     except KeyboardInterrupt:
         logger.error("Keyboard interrupt received. Exiting...")
         sys.exit()
+    finally:
+        save_page_counts(PAGE_COUNTS_PATH)
+        if md_pool is not None:
+            md_pool.shutdown()
 
 
 if __name__ == "__main__":
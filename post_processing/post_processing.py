@@ -1,15 +1,19 @@
 from typing import Any, Optional
 
+import asyncio
 import json
 import os
-from math import ceil
 
+import numpy as np
+import orjson
 import pandas as pd
+import pyarrow.parquet as pq
 from tqdm import tqdm
 from dotenv import load_dotenv
 from loguru import logger
 
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from langchain_core.runnables import Runnable
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_openai import ChatOpenAI
@@ -26,6 +30,21 @@ MODEL = os.getenv("MODEL_JUDGE", "gpt-4o-mini")
 
 _MAX_LITERAL_LEN = 10_000
 
+# Values shorter than this are never accepted by the verbatim-containment
+# prefilter ("No" would otherwise match "not", "CA" match "case", ...)
+_MIN_CONTAINED_LEN = 4
+
+# LLM validation requests kept in flight at once (per field); throughput is
+# governed by the rate limiter below, so this can be generous
+MAX_LLM_CONCURRENCY = int(os.getenv("MAX_LLM_CONCURRENCY", "64"))
+# token-bucket cap on OpenAI requests per second (0 disables the limiter)
+LLM_REQUESTS_PER_SECOND = float(os.getenv("LLM_REQUESTS_PER_SECOND", "8"))
+LLM_MAX_BURST = int(os.getenv("LLM_MAX_BURST", "16"))
+# fields validated concurrently
+MAX_PARALLEL_FIELDS = int(os.getenv("MAX_PARALLEL_FIELDS", "4"))
+# rows packed into one validation prompt (1 = one request per row)
+ROWS_PER_PROMPT = int(os.getenv("ROWS_PER_PROMPT", "8"))
+
 # ------------------------------
 # Config for which fields to check
 # ------------------------------
@@ -38,63 +57,107 @@ DEFAULT_FIELD_CONFIGS = get_all_field_configs()
 # ------------------------------
 
 
-def make_validator_chain(model: Optional[Runnable] = None) -> Runnable:
+_VALIDATOR_SYSTEM = (
+    "You are a scientific validator. Your job is to check whether "
+    "specific extracted values are REALLY supported by the evidence sentences.\n\n"
+    "Rules:\n"
+    "1. Only use the provided sentences as evidence; ignore any outside knowledge.\n"
+    "2. A value is SUPPORTED only if the sentence clearly states that this value "
+    "applies to THIS study's own patients/measurements.\n"
+    "3. If the sentence is background, refers to other studies, guidelines, or "
+    "general statements (not specifically 'we measured', 'in this study', etc.), "
+    "then the value is NOT supported.\n\n"
+    "Output JSON with booleans as described."
+)
+
+# Built once at import and shared by every chain (all are stateless)
+_VALIDATOR_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", _VALIDATOR_SYSTEM),
+        (
+            "user",
+            (
+                "Field name: {field_label}\n"
+                "Row identifier: {row_id}\n\n"
+                "Extracted values (as a JSON array or scalar):\n"
+                "{values_json}\n\n"
+                "Supporting sentences (same order, JSON array or scalar):\n"
+                "{sentences_json}\n\n"
+                "For each value, decide if it is supported by its corresponding sentence. "
+                "If values and sentences are lists, check value[i] against sentence[i] for each index i.\n"
+                "Respond ONLY with JSON of the form:\n"
+                "{{\n"
+                '  "is_list": true | false,\n'
+                '  "supported": [true/false or single bool],\n'
+                '  "notes": "short explanation if needed"\n'
+                "}}\n"
+            ),
+        ),
+    ]
+)
+
+# Several rows per request, so the system prompt and round trip are paid once
+_VALIDATOR_MULTI_PROMPT = ChatPromptTemplate.from_messages(
+    [
+        ("system", _VALIDATOR_SYSTEM),
+        (
+            "user",
+            (
+                "Field name: {field_label}\n\n"
+                "Rows to check (JSON array; each row has a row_id, its extracted "
+                "values and the supporting sentences in the same order, each a JSON "
+                "array or scalar):\n"
+                "{rows_json}\n\n"
+                "For every row, decide for each value if it is supported by its "
+                "corresponding sentence. If values and sentences are lists, check "
+                "values[i] against sentences[i] for each index i.\n"
+                "Respond ONLY with JSON of the form:\n"
+                "{{\n"
+                '  "rows": [\n'
+                '    {{"row_id": "<row_id>", "supported": [true/false or single bool]}}\n'
+                "  ]\n"
+                "}}\n"
+                "with exactly one entry per row_id.\n"
+            ),
+        ),
+    ]
+)
+
+_VALIDATOR_PARSER = JsonOutputParser()
+
+
+def make_validator_chain(
+    model: Optional[Runnable] = None, multi_row: bool = False
+) -> Runnable:
     """
     Create an LLM chain that, given a field name, extracted values, and supporting sentences,
     returns JSON with booleans indicating whether each value is supported by the sentence.
+
+    With `multi_row`, the chain takes a JSON array of rows (`rows_json`) and
+    returns {"rows": [{"row_id": ..., "supported": ...}, ...]}.
     """
     if model is None:
         if not os.getenv("OPENAI_API_KEY"):
             raise RuntimeError(
                 "OPENAI_API_KEY is not set — required for post-processing validation"
             )
+        rate_limiter = (
+            InMemoryRateLimiter(
+                requests_per_second=LLM_REQUESTS_PER_SECOND,
+                check_every_n_seconds=0.1,
+                max_bucket_size=LLM_MAX_BURST,
+            )
+            if LLM_REQUESTS_PER_SECOND > 0
+            else None
+        )
         model = ChatOpenAI(
             model=MODEL,
             temperature=0.0,
+            rate_limiter=rate_limiter,
         )
 
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                (
-                    "You are a scientific validator. Your job is to check whether "
-                    "specific extracted values are REALLY supported by the evidence sentences.\n\n"
-                    "Rules:\n"
-                    "1. Only use the provided sentences as evidence; ignore any outside knowledge.\n"
-                    "2. A value is SUPPORTED only if the sentence clearly states that this value "
-                    "applies to THIS study's own patients/measurements.\n"
-                    "3. If the sentence is background, refers to other studies, guidelines, or "
-                    "general statements (not specifically 'we measured', 'in this study', etc.), "
-                    "then the value is NOT supported.\n\n"
-                    "Output JSON with booleans as described."
-                ),
-            ),
-            (
-                "user",
-                (
-                    "Field name: {field_label}\n"
-                    "Row identifier: {row_id}\n\n"
-                    "Extracted values (as a JSON array or scalar):\n"
-                    "{values_json}\n\n"
-                    "Supporting sentences (same order, JSON array or scalar):\n"
-                    "{sentences_json}\n\n"
-                    "For each value, decide if it is supported by its corresponding sentence. "
-                    "If values and sentences are lists, check value[i] against sentence[i] for each index i.\n"
-                    "Respond ONLY with JSON of the form:\n"
-                    "{{\n"
-                    '  "is_list": true | false,\n'
-                    '  "supported": [true/false or single bool],\n'
-                    '  "notes": "short explanation if needed"\n'
-                    "}}\n"
-                ),
-            ),
-        ]
-    )
-
-    parser = JsonOutputParser()
-    chain = prompt | model | parser
-    return chain
+    prompt = _VALIDATOR_MULTI_PROMPT if multi_row else _VALIDATOR_PROMPT
+    return prompt | model | _VALIDATOR_PARSER
 
 
 # ------------------------------
@@ -102,13 +165,21 @@ def make_validator_chain(model: Optional[Runnable] = None) -> Runnable:
 # ------------------------------
 
 
+def _to_json(v: Any) -> str:
+    """Serialize for the prompt with orjson, falling back to json for odd types."""
+    try:
+        return orjson.dumps(v, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+    except TypeError:
+        return json.dumps(v, ensure_ascii=False, default=str)
+
+
 def _try_parse_str(v: str) -> Any:
     """Try to parse a string as JSON. Returns the parsed value or the original string."""
     if len(v) > _MAX_LITERAL_LEN:
         return v
     try:
-        return json.loads(v)
-    except (json.JSONDecodeError, ValueError):
+        return orjson.loads(v)
+    except orjson.JSONDecodeError:
         # Handle Python-style literals (single quotes) as a fallback
         try:
             return json.loads(v.replace("'", '"'))
@@ -152,54 +223,73 @@ def _normalize_scalar_or_list(v: Any, expect_list: bool) -> list[Any] | Any:
         return v
 
 
-def _apply_llm_result_to_row(
-    row: pd.Series,
+def _normalize_column(values: np.ndarray, expect_list: bool) -> list[Any]:
+    """Column-wise _normalize_scalar_or_list over an object array."""
+    return [_normalize_scalar_or_list(v, expect_list) for v in values]
+
+
+def _values_in_sentences(values: Any, sentences: Any) -> bool:
+    """
+    True if every value appears verbatim (casefolded) in its own sentence, in
+    which case the value is treated as supported without asking the LLM.
+    """
+    if isinstance(values, list):
+        if not isinstance(sentences, list) or not values:
+            return False
+        if len(values) != len(sentences):
+            return False
+        pairs = zip(values, sentences)
+    else:
+        pairs = [(values, sentences)]
+
+    for v, sent in pairs:
+        if not isinstance(v, (str, int, float)) or not isinstance(sent, str):
+            return False
+        needle = str(v).strip().casefold()
+        if len(needle) < _MIN_CONTAINED_LEN or needle not in sent.casefold():
+            return False
+    return True
+
+
+def _apply_llm_result(
     cfg: FieldValidationConfig,
     values: Any,
     sentences: Any,
     result: dict,
-) -> pd.Series:
+) -> dict[str, Any]:
     """
-    Given an LLM result JSON for one row and field, return a copy of the row
-    with sentences kept and unsupported values removed/nulled out.
+    Given an LLM result JSON for one row and field, return the column updates
+    for that row: sentences kept and unsupported values removed/nulled out.
+    An empty dict means the row is left unchanged.
     """
     supported = result.get("supported")
-    row_copy = row.copy()
 
     if cfg.is_list:
         if not isinstance(values, list) or not isinstance(sentences, list):
-            return row_copy
+            return {}
         if not isinstance(supported, list):
-            return row_copy
+            return {}
         if len(values) != len(sentences) or len(values) != len(supported):
-            return row_copy
+            return {}
 
         # Keep all sentences unchanged, but filter out unsupported values
-        # Filter out None values to avoid ['None'] in output
-        filtered_values = []
-        for v, ok in zip(values, supported):
-            # Only keep the value if it's supported
-            if ok:
-                filtered_values.append(v)
-
-        # Set to empty list if all values were filtered out, otherwise use filtered list
-        # Keep sentences unchanged as requested
-        row_copy[cfg.value_field] = filtered_values if filtered_values else None
-        row_copy[cfg.sentence_field] = sentences if sentences else None
+        filtered_values = [v for v, ok in zip(values, supported) if ok]
 
-    else:
-        # scalar case
-        if isinstance(supported, list):
-            # take first if provided oddly
-            supported = bool(supported[0]) if supported else False
+        # None if all values were filtered out, otherwise the filtered list
+        return {
+            cfg.value_field: filtered_values if filtered_values else None,
+            cfg.sentence_field: sentences if sentences else None,
+        }
 
-        # Always keep the sentence for scalar case
-        # Only remove the value if not supported
-        if not supported:
-            row_copy[cfg.value_field] = None
-        # Keep the sentence field as-is
+    # scalar case
+    if isinstance(supported, list):
+        # take first if provided oddly
+        supported = bool(supported[0]) if supported else False
 
-    return row_copy
+    # Always keep the sentence for scalar case; only remove an unsupported value
+    if not supported:
+        return {cfg.value_field: None}
+    return {}
 
 
 # ------------------------------
@@ -207,121 +297,263 @@ def _apply_llm_result_to_row(
 # ------------------------------
 
 
-def validate_dataframe_with_llm(
+async def _abatch_with_progress(
+    chain: Runnable, inputs: list[dict], max_concurrency: int, desc: str
+) -> list[dict | None]:
+    """
+    Run chain.abatch over all inputs with at most `max_concurrency` requests in
+    flight, streaming progress as each request finishes. Failed requests yield
+    None so results stay aligned with inputs.
+    """
+    results: list[dict | None] = [None] * len(inputs)
+    with tqdm(total=len(inputs), desc=desc) as bar:
+        async for i, result in chain.abatch_as_completed(
+            inputs,
+            config={"max_concurrency": max_concurrency},
+            return_exceptions=True,
+        ):
+            if isinstance(result, Exception):
+                logger.warning(f"LLM call failed for {desc}: {result}")
+            else:
+                results[i] = result
+            bar.update(1)
+    return results
+
+
+async def _run_llm_rows(
+    chain: Runnable,
+    cfg: FieldValidationConfig,
+    rows: list[tuple[str, Any, Any]],
+    batch_size: int,
+    rows_per_prompt: int,
+) -> list[dict | None]:
+    """
+    Ask the LLM about (row_id, values, sentences) rows, `rows_per_prompt` rows
+    per request. Returns one result per row; rows whose request failed or that
+    are missing from the reply yield None.
+    """
+    field_label = cfg.field_label or cfg.value_field
+    desc = f"LLM validation for {cfg.value_field}"
+
+    if rows_per_prompt <= 1:
+        inputs = [
+            {
+                "field_label": field_label,
+                "row_id": row_id,
+                "values_json": _to_json(values),
+                "sentences_json": _to_json(sentences),
+            }
+            for row_id, values, sentences in rows
+        ]
+        return await _abatch_with_progress(chain, inputs, batch_size, desc)
+
+    # row_ids are positions within the prompt, so replies map back unambiguously
+    groups = [
+        rows[i : i + rows_per_prompt] for i in range(0, len(rows), rows_per_prompt)
+    ]
+    inputs = [
+        {
+            "field_label": field_label,
+            "rows_json": _to_json(
+                [
+                    {"row_id": str(j), "values": values, "sentences": sentences}
+                    for j, (_, values, sentences) in enumerate(group)
+                ]
+            ),
+        }
+        for group in groups
+    ]
+    replies = await _abatch_with_progress(chain, inputs, batch_size, desc)
+
+    results: list[dict | None] = []
+    for group, reply in zip(groups, replies):
+        by_id = {}
+        if isinstance(reply, dict) and isinstance(reply.get("rows"), list):
+            by_id = {
+                str(r.get("row_id")): r for r in reply["rows"] if isinstance(r, dict)
+            }
+        results.extend(by_id.get(str(j)) for j in range(len(group)))
+    return results
+
+
+async def _validate_field(
+    df: pd.DataFrame,
+    cfg: FieldValidationConfig,
+    chain: Runnable,
+    batch_size: int,
+    skip_contained: bool,
+    rows_per_prompt: int = 1,
+) -> dict[str, list[tuple[int, Any]]]:
+    """
+    Validate one field and return its column updates as
+    {column: [(row_position, new_value), ...]}; `df` is only read.
+    """
+    # Build inputs and metadata for rows that actually need validation
+    llm_rows = []  # (row_id, values, sentences) for rows sent to the LLM
+    meta = []  # (row_position, values, sentences) for every checked row
+    all_results: list[dict | None] = []  # parallel to meta
+    llm_slots: list[int] = []  # positions in all_results answered by the LLM
+
+    # Plain object arrays: iterating a pandas (Arrow-backed) str column boxes
+    # every element and is ~10x slower than walking the numpy array
+    raw_values = df[cfg.value_field].to_numpy(dtype=object)
+    raw_sentences = df[cfg.sentence_field].to_numpy(dtype=object)
+
+    for pos, (idx, values_raw, values, sentences) in enumerate(
+        zip(
+            df.index,
+            raw_values,
+            _normalize_column(raw_values, cfg.is_list),
+            _normalize_column(raw_sentences, cfg.is_list),
+        )
+    ):
+        # If value is empty, nothing to do
+        if values_raw in (None, "", [], {}):
+            continue
+
+        # If we don't have sentences, we can't validate – keep as-is
+        if sentences in (None, "", [], {}):
+            continue
+
+        # For lists, lengths must match for 1:1 mapping; if not, leave as-is
+        if cfg.is_list and isinstance(values, list) and isinstance(sentences, list):
+            if len(values) != len(sentences):
+                # skip this row for validation
+                continue
+
+        meta.append((pos, values, sentences))
+        if skip_contained and _values_in_sentences(values, sentences):
+            supported = [True] * len(values) if cfg.is_list else True
+            all_results.append({"supported": supported})
+            continue
+
+        llm_slots.append(len(all_results))
+        all_results.append(None)
+        llm_rows.append((str(idx), values, sentences))
+
+    if not meta:
+        # nothing to validate for this field
+        return {}
+
+    if llm_rows:
+        llm_results = await _run_llm_rows(
+            chain, cfg, llm_rows, batch_size, rows_per_prompt
+        )
+        for slot, result in zip(llm_slots, llm_results):
+            all_results[slot] = result
+    logger.info(
+        f"'{cfg.value_field}': {len(meta) - len(llm_rows)} of {len(meta)} rows "
+        f"supported verbatim, {len(llm_rows)} sent to the LLM"
+    )
+
+    updates: dict[str, list[tuple[int, Any]]] = {}
+    for (pos, values, sentences), result in zip(meta, all_results):
+        if result is None:
+            # skip this row on error
+            continue
+        for col, val in _apply_llm_result(cfg, values, sentences, result).items():
+            updates.setdefault(col, []).append((pos, val))
+    return updates
+
+
+async def avalidate_dataframe_with_llm(
     df: pd.DataFrame,
     field_configs: list[FieldValidationConfig] | None = None,
     model: Optional[Runnable] = None,
-    batch_size: int = 16,
+    batch_size: int = MAX_LLM_CONCURRENCY,
+    skip_contained: bool = False,
+    max_parallel_fields: int = MAX_PARALLEL_FIELDS,
+    rows_per_prompt: int = ROWS_PER_PROMPT,
 ) -> pd.DataFrame:
     """
-    Run LLM-based validation over all rows and configured fields, using batched
-    LLM calls (chain.batch).
+    Run LLM-based validation over all rows and configured fields. Up to
+    `max_parallel_fields` fields are validated at once, each keeping up to
+    `batch_size` LLM requests in flight (chain.abatch).
+
+    `skip_contained` (off by default) marks rows whose values all appear
+    verbatim in their sentences as supported without an LLM call. Extracted
+    values nearly always appear in their own sentence, so this also skips the
+    background/other-study checks; only enable it when those don't matter.
+    Rows are packed `rows_per_prompt` to a request (1 sends one request per row).
 
     Returns a new DataFrame with invalid values nulled out.
     """
     if field_configs is None:
         field_configs = DEFAULT_FIELD_CONFIGS
 
-    chain = make_validator_chain(model=model)
-    df_validated = df.copy()
+    chain = make_validator_chain(model=model, multi_row=rows_per_prompt > 1)
 
+    runnable_cfgs = []
     for cfg in field_configs:
         missing_cols = [
-            c
-            for c in [cfg.value_field, cfg.sentence_field]
-            if c not in df_validated.columns
+            c for c in [cfg.value_field, cfg.sentence_field] if c not in df.columns
         ]
         if missing_cols:
             logger.info(
                 f"Skipping field '{cfg.value_field}' – missing columns: {missing_cols}"
             )
             continue
+        runnable_cfgs.append(cfg)
 
-        logger.info(f"Validating field '{cfg.value_field}' using LLM (batched)...")
-
-        # Build inputs and metadata for rows that actually need validation
-        inputs = []  # list of dicts to feed into chain.batch
-        meta = []  # parallel list: (row_index, values, sentences)
-
-        for idx, row in df_validated.iterrows():
-            values_raw = row.get(cfg.value_field)
-            sentences_raw = row.get(cfg.sentence_field)
-
-            # If value is empty, nothing to do
-            if values_raw in (None, "", [], {}):
-                continue
+    field_slots = asyncio.Semaphore(max(1, max_parallel_fields))
 
-            values = _normalize_scalar_or_list(values_raw, cfg.is_list)
-            sentences = _normalize_scalar_or_list(sentences_raw, cfg.is_list)
-
-            # If we don't have sentences, we can't validate – keep as-is
-            if sentences in (None, "", [], {}):
-                continue
-
-            # For lists, lengths must match for 1:1 mapping; if not, leave as-is
-            if cfg.is_list and isinstance(values, list) and isinstance(sentences, list):
-                if len(values) != len(sentences):
-                    # skip this row for validation
-                    continue
-
-            values_json = json.dumps(values, ensure_ascii=False)
-            sentences_json = json.dumps(sentences, ensure_ascii=False)
-
-            inputs.append(
-                {
-                    "field_label": cfg.field_label or cfg.value_field,
-                    "row_id": str(idx),
-                    "values_json": values_json,
-                    "sentences_json": sentences_json,
-                }
+    async def _bounded(cfg: FieldValidationConfig):
+        async with field_slots:
+            logger.info(f"Validating field '{cfg.value_field}' using LLM (batched)...")
+            return await _validate_field(
+                df, cfg, chain, batch_size, skip_contained, rows_per_prompt
             )
-            meta.append((idx, values, sentences))
 
-        if not inputs:
-            # nothing to validate for this field
-            continue
+    # every field reads the untouched input; updates are applied afterwards
+    per_field = await asyncio.gather(*(_bounded(cfg) for cfg in runnable_cfgs))
 
-        total = len(inputs)
-        num_batches = ceil(total / batch_size)
-        all_results: list[dict | None] = []
+    # Patch copies of the touched columns only (in config order), then swap
+    # them in with a single assign; untouched columns are never cloned
+    new_cols: dict[str, np.ndarray] = {}
+    for updates in per_field:
+        for col, col_updates in updates.items():
+            if col not in new_cols:
+                new_cols[col] = df[col].to_numpy(dtype=object, copy=True)
+            arr = new_cols[col]
+            for pos, val in col_updates:
+                arr[pos] = val
+
+    return df.assign(**new_cols) if new_cols else df.copy(deep=False)
 
-        for b in tqdm(
-            range(num_batches),
-            desc=f"LLM batches for {cfg.value_field}",
-        ):
-            start = b * batch_size
-            end = min((b + 1) * batch_size, total)
-            batch_inputs = inputs[start:end]
-
-            try:
-                batch_results = chain.batch(batch_inputs)
-            except Exception as e:
-                logger.warning(
-                    f"LLM batch failed for field '{cfg.value_field}' "
-                    f"batch {b + 1}/{num_batches}: {e}"
-                )
-                # Fill with None so lengths stay aligned
-                batch_results = [None] * len(batch_inputs)
-
-            all_results.extend(batch_results)
-
-        # Apply results back to df_validated
-        for (idx, values, sentences), result in zip(meta, all_results):
-            if result is None:
-                # skip this row on error
-                continue
-            row = df_validated.loc[idx]
-            row = _apply_llm_result_to_row(row, cfg, values, sentences, result)
-            df_validated.loc[idx] = row
 
-    return df_validated
+def validate_dataframe_with_llm(
+    df: pd.DataFrame,
+    field_configs: list[FieldValidationConfig] | None = None,
+    model: Optional[Runnable] = None,
+    batch_size: int = MAX_LLM_CONCURRENCY,
+    skip_contained: bool = False,
+    max_parallel_fields: int = MAX_PARALLEL_FIELDS,
+    rows_per_prompt: int = ROWS_PER_PROMPT,
+) -> pd.DataFrame:
+    """Synchronous wrapper around avalidate_dataframe_with_llm."""
+    return asyncio.run(
+        avalidate_dataframe_with_llm(
+            df,
+            field_configs=field_configs,
+            model=model,
+            batch_size=batch_size,
+            skip_contained=skip_contained,
+            max_parallel_fields=max_parallel_fields,
+            rows_per_prompt=rows_per_prompt,
+        )
+    )
 
 
 if __name__ == "__main__":
-    df = pd.read_csv("output/aggregated/df_annotations.csv")
+    # to_pylist keeps list fields as Python lists (pandas would give ndarrays)
+    df = pd.DataFrame(
+        pq.read_table("output/aggregated/df_annotations.parquet").to_pylist()
+    )
     # df = df.iloc[:10]
-    df_validated = validate_dataframe_with_llm(df, batch_size=16)
-    df_validated.to_csv(
-        "output/aggregated/df_annotations_validated.csv",
+    df_validated = validate_dataframe_with_llm(df)
+    df_validated.to_parquet(
+        "output/aggregated/df_annotations_validated.parquet",
         index=False,
+        engine="pyarrow",
+        compression="zstd",
     )
@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any, Union, get_origin, get_args
 from pydantic import BaseModel
 
@@ -100,10 +101,16 @@ def build_field_configs_for_model(
 # -------------------------------------------------
 # Get all field configs
 # -------------------------------------------------
+@lru_cache(maxsize=None)
+def _default_field_configs(model: type[BaseModel]) -> tuple[FieldValidationConfig, ...]:
+    """Reflect over `model` once; later calls reuse the result."""
+    return tuple(build_field_configs_for_model(model))
+
+
 def get_all_field_configs() -> list[FieldValidationConfig]:
     configs: list[FieldValidationConfig] = []
     for schema in EXTRACTION_SCHEMAS:
-        configs.extend(build_field_configs_for_model(schema))
+        configs.extend(_default_field_configs(schema))
     return configs
 
 
@@ -1,9 +1,10 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from loguru import logger
 import sys
 import os
 
-from pdf_section_stripper.pipeline import PDFSectionStripper
+from pdf_section_stripper.pipeline import PDFSectionStripper, StripResult
 from pdf_section_stripper.config import StripConfig
 from rich.progress import track
 
@@ -19,6 +20,11 @@ def setup_logging():
     )
 
 
+def _process_one(cfg: StripConfig, in_path: Path, out_path: Path) -> StripResult:
+    """Strip one PDF (runs in a worker process; every PDF is independent)."""
+    return PDFSectionStripper(cfg).process_pdf(in_path, out_path)
+
+
 def main():
     setup_logging()
 
@@ -38,19 +44,36 @@ def main():
     )
     # ----------------------------------------------
 
-    stripper = PDFSectionStripper(cfg)
-
     pdfs = sorted(INPUT_DIR.glob("*.pdf"))
     if not pdfs:
         logger.error(f"No PDFs found in {INPUT_DIR}")
         return
 
-    for p in track(pdfs, description="Processing PDFs"):
-        out = OUTPUT_DIR / p.name
-        result = stripper.process_pdf(p, out)
-        logger.debug(
-            f"Processed {p.name} -> {out.name} with {result.kept_pages}/{result.total_pages} pages"
-        )
+    # MuPDF extraction + fuzzy matching is CPU-bound: one process per core.
+    # Spawned workers start with loguru's default DEBUG sink, so they get the
+    # same logging setup as this process.
+    with ProcessPoolExecutor(
+        max_workers=os.cpu_count(), initializer=setup_logging
+    ) as ex:
+        futures = {
+            ex.submit(_process_one, cfg, p, OUTPUT_DIR / p.name): p for p in pdfs
+        }
+        for f in track(
+            as_completed(futures), total=len(futures), description="Processing PDFs"
+        ):
+            p = futures[f]
+            try:
+                result = f.result()
+            except Exception as e:
+                logger.error(f"Failed to strip {p.name}: {e}")
+                continue
+            logger.debug(
+                "Processed {} -> {} with {}/{} pages",
+                p.name,
+                result.output_path.name,
+                result.kept_pages,
+                result.total_pages,
+            )
 
 
 if __name__ == "__main__":
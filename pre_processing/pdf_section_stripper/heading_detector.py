@@ -1,60 +1,32 @@
-import re
-from typing import List, Tuple, Optional, Dict
+from collections import Counter
+from typing import List, Tuple, Optional, Dict, Sequence
 
 import fitz
-from rapidfuzz import fuzz
 
 from pdf_section_stripper.config import StripConfig
 from pdf_section_stripper.models import FoundHeading
+from pdf_section_stripper.titles import best_title_kind, norm_title
 
+# (page index, line text, line bbox) of a heading-like line
+HeadingCandidate = Tuple[int, str, fitz.Rect]
 
-INTRO_TITLES = ["introduction", "background"]
-METHODS_TITLES = [
-    "methods",
-    "materials and methods",
-    "patients and methods",
-    "methodology",
-    "experimental procedures",
-]
-ACK_TITLES = ["acknowledgements", "acknowledgments"]
-REF_TITLES = ["references", "bibliography", "works cited"]
 
-
-def _norm(s: str) -> str:
-    s = s.strip().lower()
-    s = re.sub(r"\s+", " ", s)
-    return s
-
-
-def _page_median_fontsize(page: fitz.Page) -> float:
-    sizes = []
-    d = page.get_text("dict")
+def _median_fontsize(d: dict) -> float:
+    # font sizes are heavily quantized (a handful per page), so count them and
+    # walk the few distinct values instead of sorting every span
+    sizes: Counter[float] = Counter()
     for b in d.get("blocks", []):
         for ln in b.get("lines", []):
             for sp in ln.get("spans", []):
                 sz = sp.get("size")
                 if isinstance(sz, (int, float)):
-                    sizes.append(float(sz))
-    if not sizes:
-        return 0.0
-    sizes.sort()
-    return sizes[len(sizes) // 2]
-
-
-def _best_title_match(text: str, candidates: List[str]) -> Tuple[Optional[str], int]:
-    nt = _norm(text)
-    best = None
-    best_score = -1
-    for c in candidates:
-        score = max(
-            fuzz.partial_ratio(nt, c),
-            fuzz.token_set_ratio(nt, c),
-            fuzz.ratio(nt, c),
-        )
-        if score > best_score:
-            best_score = score
-            best = c
-    return best, best_score
+                    sizes[float(sz)] += 1
+    mid = sizes.total() // 2
+    for sz in sorted(sizes):
+        mid -= sizes[sz]
+        if mid < 0:
+            return sz
+    return 0.0
 
 
 def _is_heading_like(
@@ -78,12 +50,46 @@ def _is_heading_like(
     return True
 
 
-def find_headings_in_page(
-    page: fitz.Page, page_index: int, cfg: StripConfig
-) -> List[FoundHeading]:
-    d = page.get_text("dict")
-    median_font = _page_median_fontsize(page)
-    candidates: List[FoundHeading] = []
+def _may_have_headings(
+    page: fitz.Page, cfg: StripConfig, textpage: Optional[fitz.TextPage] = None
+) -> bool:
+    """
+    Cheap prefilter on MuPDF's "blocks" output (plain tuples, no spans): True
+    if any text block's first line passes the length/shape checks of
+    _is_heading_like. Font size needs the full dict, so it is not checked here.
+    """
+    for *_, text, _block_no, block_type in page.get_text("blocks", textpage=textpage):
+        if block_type != 0:
+            continue
+        if _is_heading_like(text.split("\n", 1)[0], 0.0, 0.0, cfg):
+            return True
+    return False
+
+
+def collect_heading_candidates(
+    page: fitz.Page,
+    page_index: int,
+    cfg: StripConfig,
+    text_dict: Optional[dict] = None,
+) -> List[HeadingCandidate]:
+    """Layout filtering only: heading-like first lines of the page's text blocks."""
+    if text_dict is None:
+        # One TextPage backs both the blocks prefilter and the dict, so MuPDF
+        # parses the page content once. Image blocks are never used, so they
+        # are left out (TEXTFLAGS_BLOCKS is the dict default minus images).
+        tp = page.get_textpage(flags=fitz.TEXTFLAGS_BLOCKS)
+        try:
+            # skip the dict extraction on pages with no heading-shaped line
+            if not _may_have_headings(page, cfg, tp):
+                return []
+            text_dict = page.get_text("dict", textpage=tp)
+        finally:
+            # release MuPDF's structured-text buffers before scoring
+            del tp
+    # one dict extraction serves both the median font size and the candidates
+    d = text_dict
+    median_font = _median_fontsize(d)
+    candidates: List[HeadingCandidate] = []
 
     for b in d.get("blocks", []):
         if b.get("type") != 0:
@@ -118,47 +124,61 @@ def find_headings_in_page(
         r = rects[0]
         for rr in rects[1:]:
             r |= rr
+        candidates.append((page_index, line_text, r))
+
+    return candidates
 
-        kind = None
-        score = -1
-
-        # classify by best match
-        m, s = _best_title_match(line_text, METHODS_TITLES)
-        if m and s > score:
-            kind, score = "methods", s
-
-        if cfg.remove_refs:
-            m, s = _best_title_match(line_text, REF_TITLES)
-            if m and s > score:
-                kind, score = "refs", s
-
-        if cfg.remove_ack:
-            m, s = _best_title_match(line_text, ACK_TITLES)
-            if m and s > score:
-                kind, score = "ack", s
-
-        if cfg.remove_intro or cfg.remove_background:
-            m, s = _best_title_match(line_text, INTRO_TITLES)
-            if m and s > score:
-                kind, score = "intro", s
-
-        if kind and score >= cfg.min_heading_score:
-            candidates.append(
-                FoundHeading(
-                    page=page_index,
-                    y0=r.y0,
-                    y1=r.y1,
-                    text=line_text,
-                    kind=kind,
-                    score=score,
-                )
-            )
+
+def classify_heading_candidates(
+    candidates: Sequence[HeadingCandidate], cfg: StripConfig
+) -> List[FoundHeading]:
+    """
+    Score candidates from any number of pages in one matrix and keep the best
+    heading per kind per page.
+    """
+    if not candidates:
+        return []
+
+    # classify against every enabled title at once; earlier kinds win ties
+    kinds = {"methods"}
+    if cfg.remove_refs:
+        kinds.add("refs")
+    if cfg.remove_ack:
+        kinds.add("ack")
+    if cfg.remove_intro or cfg.remove_background:
+        kinds.add("intro")
+
+    queries = [norm_title(t) for _, t, _ in candidates]
+    best_kinds, best_scores = best_title_kind(queries, kinds)
 
     # keep best per kind per page
-    best_by_kind: Dict[str, FoundHeading] = {}
-    for h in candidates:
-        prev = best_by_kind.get(h.kind)
+    best_by_kind: Dict[Tuple[int, str], FoundHeading] = {}
+    for (page_index, line_text, r), kind, score in zip(
+        candidates, best_kinds, best_scores
+    ):
+        if score < cfg.min_heading_score:
+            continue
+        h = FoundHeading(
+            page=page_index,
+            y0=r.y0,
+            y1=r.y1,
+            text=line_text,
+            kind=str(kind),
+            score=float(score),
+        )
+        prev = best_by_kind.get((page_index, h.kind))
         if prev is None or h.score > prev.score:
-            best_by_kind[h.kind] = h
+            best_by_kind[(page_index, h.kind)] = h
 
     return list(best_by_kind.values())
+
+
+def find_headings_in_page(
+    page: fitz.Page,
+    page_index: int,
+    cfg: StripConfig,
+    text_dict: Optional[dict] = None,
+) -> List[FoundHeading]:
+    return classify_heading_candidates(
+        collect_heading_candidates(page, page_index, cfg, text_dict), cfg
+    )
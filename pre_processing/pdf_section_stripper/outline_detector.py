@@ -1,41 +1,16 @@
-from typing import List, Tuple, Optional
+from typing import List, Optional, Tuple
 
 import fitz
-from rapidfuzz import fuzz
+import numpy as np
 
 from pdf_section_stripper.config import StripConfig
 from pdf_section_stripper.models import SectionCuts
-
-INTRO_TITLES = ["introduction", "background"]
-METHODS_TITLES = [
-    "methods",
-    "materials and methods",
-    "patients and methods",
-    "methodology",
-    "experimental procedures",
-]
-ACK_TITLES = ["acknowledgements", "acknowledgments"]
-REF_TITLES = ["references", "bibliography", "works cited"]
-
-
-def _norm(s: str) -> str:
-    return " ".join(s.strip().lower().split())
-
-
-def _best_title_match(text: str, candidates: List[str]) -> Tuple[Optional[str], int]:
-    nt = _norm(text)
-    best = None
-    best_score = -1
-    for c in candidates:
-        score = max(
-            fuzz.partial_ratio(nt, c),
-            fuzz.token_set_ratio(nt, c),
-            fuzz.ratio(nt, c),
-        )
-        if score > best_score:
-            best_score = score
-            best = c
-    return best, best_score
+from pdf_section_stripper.titles import (
+    ALL_TITLES_NORM,
+    KIND_FOR_COL,
+    norm_title,
+    title_scores,
+)
 
 
 def _extract_outline_entries(doc: fitz.Document) -> List[Tuple[int, str]]:
@@ -54,27 +29,24 @@ def detect_cuts_from_outline(doc: fitz.Document, cfg: StripConfig) -> SectionCut
     if not entries:
         return cuts
 
-    for p, title in entries:
-        t = _norm(title)
-
-        if cuts.refs_start is None and cfg.remove_refs:
-            m, s = _best_title_match(t, REF_TITLES)
-            if m and s >= cfg.min_heading_score:
-                cuts.refs_start = p
-
-        if cuts.ack_start is None and cfg.remove_ack:
-            m, s = _best_title_match(t, ACK_TITLES)
-            if m and s >= cfg.min_heading_score:
-                cuts.ack_start = p
-
-        if cuts.intro_start is None and (cfg.remove_intro or cfg.remove_background):
-            m, s = _best_title_match(t, INTRO_TITLES)
-            if m and s >= cfg.min_heading_score:
-                cuts.intro_start = p
-
-        if cuts.methods_start is None:
-            m, s = _best_title_match(t, METHODS_TITLES)
-            if m and s >= cfg.min_heading_score:
-                cuts.methods_start = p
+    queries = [norm_title(title) for _, title in entries]
+
+    # one score matrix against every title; kinds are column slices of it
+    scores = title_scores(queries, ALL_TITLES_NORM)
+
+    def first_match(kind: str) -> Optional[int]:
+        """Page of the first TOC entry matching a `kind` title, or None."""
+        best = scores[:, KIND_FOR_COL == kind].max(axis=1)
+        hits = np.flatnonzero(best >= cfg.min_heading_score)
+        return entries[hits[0]][0] if hits.size else None
+
+    # only kinds the config removes are resolved (methods bounds intro removal)
+    if cfg.remove_refs:
+        cuts.refs_start = first_match("refs")
+    if cfg.remove_ack:
+        cuts.ack_start = first_match("ack")
+    if cfg.remove_intro or cfg.remove_background:
+        cuts.intro_start = first_match("intro")
+    cuts.methods_start = first_match("methods")
 
     return cuts
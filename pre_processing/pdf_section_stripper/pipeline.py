@@ -1,37 +1,65 @@
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 import fitz
 from loguru import logger
 
 from pdf_section_stripper.config import StripConfig
-from pdf_section_stripper.models import SectionCuts
+from pdf_section_stripper.models import FoundHeading, SectionCuts
 from pdf_section_stripper.outline_detector import detect_cuts_from_outline
-from pdf_section_stripper.heading_detector import find_headings_in_page
+from pdf_section_stripper.heading_detector import (
+    classify_heading_candidates,
+    collect_heading_candidates,
+    find_headings_in_page,
+)
 from pdf_section_stripper.planner import build_plan
 from pdf_section_stripper.writer import write_stripped_pdf
 
 
-def detect_cuts_from_layout(doc: fitz.Document, cfg: StripConfig) -> SectionCuts:
+def detect_cuts_from_layout(
+    doc: fitz.Document, cfg: StripConfig, max_pages: Optional[int] = None
+) -> SectionCuts:
+    """Fuzzy heading detection; only the first `max_pages` pages if given."""
     cuts = SectionCuts()
-    n = doc.page_count
+    n = doc.page_count if max_pages is None else min(doc.page_count, max_pages)
 
-    # early pages: intro + methods
+    # headings are extracted at most once per page across both scans
+    page_headings: Dict[int, List[FoundHeading]] = {}
+
+    def headings(i: int) -> List[FoundHeading]:
+        if i not in page_headings:
+            page_headings[i] = find_headings_in_page(doc[i], i, cfg)
+        return page_headings[i]
+
+    # early pages: intro + methods. Every one of them is needed, so their
+    # candidates are scored together in a single matrix
     scan_n = min(n, max(cfg.max_scan_pages_for_intro, 1))
+    candidates = [
+        c for i in range(scan_n) for c in collect_heading_candidates(doc[i], i, cfg)
+    ]
+    for i in range(scan_n):
+        page_headings[i] = []
+    for h in classify_heading_candidates(candidates, cfg):
+        page_headings[h.page].append(h)
+
     for i in range(scan_n):
-        hs = find_headings_in_page(doc[i], i, cfg)
-        for h in hs:
+        for h in headings(i):
             if h.kind == "intro" and cuts.intro_start is None:
                 cuts.intro_start = i
                 cuts.intro_heading = h
             elif h.kind == "methods" and cuts.methods_start is None:
                 cuts.methods_start = i
 
-    # all pages: ack + refs (usually end)
+    # ack + refs: the first occurrence of each defines the cut, so a later
+    # supplementary reference list never moves it. Pages are classified one
+    # at a time so the scan stops as soon as every wanted kind is found
     for i in range(n):
-        hs = find_headings_in_page(doc[i], i, cfg)
-        for h in hs:
+        if (not cfg.remove_refs or cuts.refs_start is not None) and (
+            not cfg.remove_ack or cuts.ack_start is not None
+        ):
+            break
+        for h in headings(i):
             if h.kind == "ack" and cuts.ack_start is None:
                 cuts.ack_start = i
                 cuts.ack_heading = h
@@ -42,6 +70,18 @@ def detect_cuts_from_layout(doc: fitz.Document, cfg: StripConfig) -> SectionCuts
     return cuts
 
 
+def _outline_is_complete(cuts: SectionCuts, cfg: StripConfig) -> bool:
+    """True if the outline already gives every cut the config asks for."""
+    needed = []
+    if cfg.remove_refs:
+        needed.append(cuts.refs_start)
+    if cfg.remove_ack:
+        needed.append(cuts.ack_start)
+    if cfg.remove_intro or cfg.remove_background:
+        needed += [cuts.intro_start, cuts.methods_start]
+    return all(start is not None for start in needed)
+
+
 @dataclass
 class StripResult:
     output_path: Path
@@ -64,12 +104,23 @@ class PDFSectionStripper:
         try:
             doc = fitz.open(str(input_path))
             outline_cuts = detect_cuts_from_outline(doc, self.cfg)
-            layout_cuts = detect_cuts_from_layout(doc, self.cfg)
+            if _outline_is_complete(outline_cuts, self.cfg):
+                # Outline cuts take precedence, so the layout pass only has to
+                # find headings on always-kept pages, where a section starting
+                # mid-page is redacted instead of dropped
+                protected = (
+                    self.cfg.keep_first_n_pages_always + self.cfg.keep_abstract_pages
+                )
+                layout_cuts = detect_cuts_from_layout(doc, self.cfg, protected)
+            else:
+                layout_cuts = detect_cuts_from_layout(doc, self.cfg)
 
             plan = build_plan(doc, outline_cuts, layout_cuts, self.cfg)
 
-            logger.debug(f"Cuts: {plan.cuts}")
-            logger.debug(f"Keep pages: {len(plan.keep_pages)} / {doc.page_count}")
+            # loguru fills "{}" only if a sink takes DEBUG, so the cuts repr is
+            # not built when debug logging is off
+            logger.debug("Cuts: {}", plan.cuts)
+            logger.debug("Keep pages: {} / {}", len(plan.keep_pages), doc.page_count)
 
             output_path.parent.mkdir(parents=True, exist_ok=True)
             write_stripped_pdf(doc, plan, str(output_path))
@@ -42,30 +42,26 @@ def build_plan(
 
     # 1) References: drop from refs start to end
     if cfg.remove_refs and cuts.refs_start is not None:
-        for i in range(cuts.refs_start, n):
-            keep_pages.discard(i)
+        keep_pages.difference_update(range(cuts.refs_start, n))
 
     # 2) Acknowledgements: drop from ack start to refs start (or end)
     if cfg.remove_ack and cuts.ack_start is not None:
         end = cuts.refs_start if cuts.refs_start is not None else n
-        for i in range(cuts.ack_start, end):
-            keep_pages.discard(i)
+        keep_pages.difference_update(range(cuts.ack_start, end))
 
     # 3) Intro/background: drop from intro start to methods start (only if methods is found and after intro)
     if (cfg.remove_intro or cfg.remove_background) and cuts.intro_start is not None:
         if cuts.methods_start is not None and cuts.methods_start > cuts.intro_start:
-            for i in range(cuts.intro_start, cuts.methods_start):
-                if i < protected_until:
-                    continue
-                keep_pages.discard(i)
+            keep_pages.difference_update(
+                range(max(cuts.intro_start, protected_until), cuts.methods_start)
+            )
         else:
             logger.debug(
                 "Planner: Methods boundary not found or not after intro; skipping intro removal for safety."
             )
 
     # Always keep first N pages (safety)
-    for i in range(min(cfg.keep_first_n_pages_always, n)):
-        keep_pages.add(i)
+    keep_pages.update(range(min(cfg.keep_first_n_pages_always, n)))
 
     # Boundary redactions (if a section starts mid-page and that page is otherwise kept)
     def add_redaction(h: Optional[FoundHeading]):
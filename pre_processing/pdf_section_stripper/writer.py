@@ -1,8 +1,23 @@
+from typing import List, Tuple
+
 import fitz
 from pdf_section_stripper.models import Plan
 from loguru import logger
 
 
+def _contiguous_runs(pages: List[int]) -> List[Tuple[int, int]]:
+    """Collapse sorted page indices into inclusive (start, end) runs."""
+    runs: List[Tuple[int, int]] = []
+    start = prev = pages[0]
+    for p in pages[1:]:
+        if p != prev + 1:
+            runs.append((start, prev))
+            start = p
+        prev = p
+    runs.append((start, prev))
+    return runs
+
+
 def write_stripped_pdf(original: fitz.Document, plan: Plan, output_path: str) -> None:
     keep = plan.keep_pages
     if not keep:
@@ -11,9 +26,10 @@ def write_stripped_pdf(original: fitz.Document, plan: Plan, output_path: str) ->
 
     out = fitz.open()
     try:
-        # Insert pages losslessly
-        for i in keep:
-            out.insert_pdf(original, from_page=i, to_page=i)
+        # Insert pages losslessly, one call per contiguous run so shared
+        # resources (fonts, images) are copied once per run, not per page
+        for start, end in _contiguous_runs(keep):
+            out.insert_pdf(original, from_page=start, to_page=end)
 
         # Map old page index -> new page index
         old_to_new = {old: new for new, old in enumerate(keep)}
@@ -0,0 +1,75 @@
+"""Tests for PDF-level resume in main.py:
+- process_one_pdf with partially failed chunks
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib
+from pathlib import Path
+
+import pytest
+
+
+@pytest.fixture
+def main_mod(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    # main creates output/ and logs/ on import, so import it from a scratch dir
+    monkeypatch.chdir(tmp_path)
+    main = importlib.import_module("main")
+    monkeypatch.setattr(main, "OUTPUT_DIR", tmp_path / "output")
+    monkeypatch.setattr(main, "OVERWRITE_MD", False)
+    monkeypatch.setattr(main, "UPLOAD_PDFS", False)
+
+    async def _pages(pdf_path, pool=None) -> int:
+        return 2 * main.MAX_PAGES_PER_REQ
+
+    async def _encode(pdf_path) -> str:
+        return "cGRm"
+
+    def _to_markdown(annotations, ocr_response, out_path: str) -> None:
+        Path(out_path).write_text("# chunk\n" + "text " * 50, encoding="utf-8")
+
+    monkeypatch.setattr(main, "get_pdf_page_count", _pages)
+    monkeypatch.setattr(main, "encode_pdf", _encode)
+    monkeypatch.setattr(main, "convert_to_markdown", _to_markdown)
+    return main
+
+
+def _fake_payloads(calls: list[int], failing_starts: set[int]):
+    async def _run(client, base64_pdf, pages, **kwargs):
+        calls.append(pages[0])
+        if pages[0] in failing_starts:
+            # one schema call failed: the other schema's fields are missing
+            return {"Journal": "BMJ"}, object(), 1
+        if pages[0] == 0:
+            return {"Journal": "BMJ"}, object(), 0
+        return {"Title": "A trial"}, object(), 0
+
+    return _run
+
+
+class TestPartialPdfResume:
+    def test_failed_chunk_is_retried_alone(
+        self, main_mod, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        pdf = tmp_path / "paper.pdf"
+        pdf.write_bytes(b"%PDF-1.7\n")
+        second = main_mod.MAX_PAGES_PER_REQ
+        sem = asyncio.Semaphore(4)
+
+        calls: list[int] = []
+        monkeypatch.setattr(
+            main_mod, "run_all_payloads", _fake_payloads(calls, {second})
+        )
+        # no partial row, so the PDF is not marked done and goes to failures
+        assert asyncio.run(main_mod.process_one_pdf(pdf, None, sem)) is None
+        assert sorted(calls) == [0, second]
+
+        calls.clear()
+        monkeypatch.setattr(main_mod, "run_all_payloads", _fake_payloads(calls, set()))
+        row = asyncio.run(main_mod.process_one_pdf(pdf, None, sem))
+        # only the chunk without a sidecar is OCR'd again
+        assert calls == [second]
+        assert row["Journal"] == "BMJ"
+        assert row["Title"] == "A trial"
+        assert row["__source_file__"] == main_mod.file_name_sha1(pdf.name)
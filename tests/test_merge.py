@@ -77,10 +77,14 @@ class TestListMerging:
 
     def test_dict_items_deduped_different_key_order(self) -> None:
         """Regression test: dicts with different key order should still dedup
-        because _merge_values uses json.dumps(sort_keys=True)."""
+        because _merge_values keys them on sorted-key JSON."""
         result = merge_dicts([{"a": [{"x": 1, "y": 2}]}, {"a": [{"y": 2, "x": 1}]}])
         assert result["a"] == [{"x": 1, "y": 2}]
 
+    def test_equal_scalars_of_different_types_are_kept(self) -> None:
+        result = merge_dicts([{"a": [1, "1"]}, {"a": [1.0, True, 1]}])
+        assert result["a"] == [1, "1", 1.0, True]
+
 
 # ---------------------------------------------------------------------------
 # Nested dict merging
@@ -0,0 +1,146 @@
+"""Tests for PDF I/O helpers in utils/utils.py:
+- encode_pdf
+- get_pdf_page_count
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import fitz as pymupdf
+import pytest
+
+import utils.utils as uu
+from utils.utils import encode_pdf, get_pdf_page_count
+
+
+# ---------------------------------------------------------------------------
+# encode_pdf
+# ---------------------------------------------------------------------------
+
+
+class TestEncodePdf:
+    def test_missing_file_returns_none(self, tmp_path: Path) -> None:
+        assert asyncio.run(encode_pdf(tmp_path / "missing.pdf")) is None
+
+    def test_small_file_round_trips(self, tmp_path: Path) -> None:
+        pdf = tmp_path / "doc.pdf"
+        data = b"%PDF-1.7\n" + bytes(range(256)) * 10
+        pdf.write_bytes(data)
+        encoded = asyncio.run(encode_pdf(pdf))
+        assert base64.b64decode(encoded) == data
+
+    @pytest.mark.parametrize("size", [0, 1, 2, 3, 1000, 3001])
+    def test_streamed_encoding_matches_one_shot(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, size: int
+    ) -> None:
+        monkeypatch.setattr(uu, "B64_STREAM_THRESHOLD", -1)
+        monkeypatch.setattr(uu, "B64_BLOCK_SIZE", 3 * 7)
+        pdf = tmp_path / "big.pdf"
+        data = bytes(i % 251 for i in range(size))
+        pdf.write_bytes(data)
+        encoded = asyncio.run(encode_pdf(pdf))
+        assert encoded == base64.b64encode(data).decode("ascii")
+
+    def test_short_reads_do_not_pad_mid_stream(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(uu, "B64_STREAM_THRESHOLD", -1)
+        monkeypatch.setattr(uu, "B64_BLOCK_SIZE", 3 * 7)
+        pdf = tmp_path / "big.pdf"
+        data = bytes(i % 251 for i in range(1000))
+        pdf.write_bytes(data)
+
+        class _ShortReads(io.FileIO):
+            # a file object may return fewer bytes than asked before EOF
+            def readinto(self, buffer) -> int:
+                return super().readinto(memoryview(buffer)[:5])
+
+        monkeypatch.setattr(uu, "open", _ShortReads, raising=False)
+        encoded = asyncio.run(encode_pdf(pdf))
+        assert encoded == base64.b64encode(data).decode("ascii")
+
+
+# ---------------------------------------------------------------------------
+# get_pdf_page_count
+# ---------------------------------------------------------------------------
+
+
+def _make_pdf(path: Path, texts: list[str]) -> Path:
+    doc = pymupdf.open()
+    for text in texts:
+        page = doc.new_page()
+        page.insert_text((72, 72), text)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+class TestGetPdfPageCount:
+    def test_counts_all_pages_without_references(self, tmp_path: Path) -> None:
+        pdf = _make_pdf(tmp_path / "a.pdf", ["Intro", "Methods", "Results"])
+        assert asyncio.run(get_pdf_page_count(pdf)) == 3
+
+    def test_stops_at_references_page(self, tmp_path: Path) -> None:
+        pdf = _make_pdf(tmp_path / "b.pdf", ["Intro", "Results", "References", "x"])
+        assert asyncio.run(get_pdf_page_count(pdf)) == 2
+
+    def test_references_bookmark_skips_text_scan(self, tmp_path: Path) -> None:
+        pdf = tmp_path / "e.pdf"
+        doc = pymupdf.open()
+        for text in ["Intro", "Results", "Cited works", "x"]:
+            doc.new_page().insert_text((72, 72), text)
+        doc.set_toc([[1, "Introduction", 1], [1, "References", 3]])
+        doc.save(pdf)
+        doc.close()
+        assert asyncio.run(get_pdf_page_count(pdf)) == 2
+
+    def test_result_is_memoised_until_file_changes(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        pdf = _make_pdf(tmp_path / "c.pdf", ["Intro", "Results"])
+        assert asyncio.run(get_pdf_page_count(pdf)) == 2
+
+        def _boom(*args, **kwargs):
+            raise AssertionError("PDF was re-scanned")
+
+        monkeypatch.setattr(uu, "_count_pages_before_refs", _boom)
+        assert asyncio.run(get_pdf_page_count(pdf)) == 2
+
+        monkeypatch.undo()
+        _make_pdf(pdf, ["Intro", "Methods", "Results", "Discussion"])
+        assert asyncio.run(get_pdf_page_count(pdf)) == 4
+
+    def test_page_counts_persist_across_runs(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        pdf = _make_pdf(tmp_path / "f.pdf", ["Intro", "References", "x"])
+        cache = tmp_path / "page_counts.json"
+        monkeypatch.setattr(uu, "_PAGE_COUNT_CACHE", {})
+        assert asyncio.run(get_pdf_page_count(pdf)) == 1
+        uu.save_page_counts(cache)
+
+        def _boom(*args, **kwargs):
+            raise AssertionError("PDF was re-scanned")
+
+        # a fresh process: empty memo, seeded from the saved file
+        monkeypatch.setattr(uu, "_PAGE_COUNT_CACHE", {})
+        monkeypatch.setattr(uu, "_count_pages_before_refs", _boom)
+        uu.load_page_counts(cache)
+        assert asyncio.run(get_pdf_page_count(pdf)) == 1
+
+    def test_scan_can_run_in_a_process_pool(self, tmp_path: Path) -> None:
+        pdf = _make_pdf(tmp_path / "d.pdf", ["Intro", "References", "x"])
+
+        async def _count() -> int:
+            # spawn: forking the threaded test process can deadlock
+            ctx = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                return await get_pdf_page_count(pdf, pool)
+
+        assert asyncio.run(_count()) == 1
@@ -0,0 +1,284 @@
+"""Tests for LLM validation in post_processing/post_processing.py.
+
+The LLM is replaced by a RunnableLambda that answers from a lookup table, so
+no network access or API key is needed.
+"""
+
+from __future__ import annotations
+
+import json
+
+import pandas as pd
+from langchain_core.runnables import RunnableLambda
+
+from post_processing.post_processing import (
+    _try_parse_str,
+    validate_dataframe_with_llm,
+)
+from post_processing.unstack_payloads import FieldValidationConfig
+
+LIST_CFG = FieldValidationConfig(
+    value_field="Countries",
+    sentence_field="Countries sentence",
+    is_list=True,
+)
+SCALAR_CFG = FieldValidationConfig(
+    value_field="Journal",
+    sentence_field="Journal sentence",
+    is_list=False,
+)
+
+
+def _fake_model(
+    supported_by_value: dict[str, bool],
+    calls: list | None = None,
+    drop_row_ids: set[str] = frozenset(),
+):
+    """Answer 'supported' per value from a table; unknown values are supported.
+
+    Handles both the single-row and the multi-row prompt; rows listed in
+    `drop_row_ids` are left out of multi-row replies.
+    """
+
+    def _supported(values):
+        if isinstance(values, list):
+            return [supported_by_value.get(str(v), True) for v in values]
+        return supported_by_value.get(str(values), True)
+
+    def _answer(prompt_value) -> str:
+        text = prompt_value.to_string()
+        if calls is not None:
+            calls.append(text)
+        if "Rows to check" in text:
+            rows = json.loads(text.split("):\n", 1)[1].split("\n\n")[0])
+            return json.dumps(
+                {
+                    "rows": [
+                        {"row_id": r["row_id"], "supported": _supported(r["values"])}
+                        for r in rows
+                        if r["row_id"] not in drop_row_ids
+                    ]
+                }
+            )
+        values_json = text.split("Extracted values (as a JSON array or scalar):\n")[1]
+        values = json.loads(values_json.split("\n\n")[0])
+        return json.dumps(
+            {"is_list": isinstance(values, list), "supported": _supported(values)}
+        )
+
+    return RunnableLambda(_answer)
+
+
+# ---------------------------------------------------------------------------
+# _try_parse_str
+# ---------------------------------------------------------------------------
+
+
+class TestTryParseStr:
+    def test_json_list(self) -> None:
+        assert _try_parse_str('["a", "b"]') == ["a", "b"]
+
+    def test_python_style_list(self) -> None:
+        assert _try_parse_str("['a', 'b']") == ["a", "b"]
+
+    def test_plain_string_is_returned_unchanged(self) -> None:
+        assert _try_parse_str("Canada") == "Canada"
+
+
+# ---------------------------------------------------------------------------
+# validate_dataframe_with_llm
+# ---------------------------------------------------------------------------
+
+
+class TestValidateDataframeWithLlm:
+    def test_filters_unsupported_list_values(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Countries": [["CA", "US"], ["FR"]],
+                "Countries sentence": [["in Canada", "elsewhere"], ["in France"]],
+            }
+        )
+        model = _fake_model({"US": False})
+        out = validate_dataframe_with_llm(df, [LIST_CFG], model=model)
+        assert out.loc[0, "Countries"] == ["CA"]
+        assert out.loc[1, "Countries"] == ["FR"]
+        # sentences are kept unchanged
+        assert out.loc[0, "Countries sentence"] == ["in Canada", "elsewhere"]
+
+    def test_nulls_unsupported_scalar(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Journal": ["BMJ", "Lancet"],
+                "Journal sentence": ["published in BMJ", "cited in a review"],
+            }
+        )
+        model = _fake_model({"Lancet": False})
+        out = validate_dataframe_with_llm(df, [SCALAR_CFG], model=model)
+        assert out.loc[0, "Journal"] == "BMJ"
+        assert pd.isna(out.loc[1, "Journal"])
+        assert out.loc[1, "Journal sentence"] == "cited in a review"
+
+    def test_rows_without_sentences_are_not_sent(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Journal": ["BMJ", "Lancet"],
+                "Journal sentence": ["published in BMJ", ""],
+            }
+        )
+        calls: list[str] = []
+        out = validate_dataframe_with_llm(
+            df, [SCALAR_CFG], model=_fake_model({}, calls)
+        )
+        assert len(calls) == 1
+        assert out.loc[1, "Journal"] == "Lancet"
+
+    def test_missing_columns_are_skipped(self) -> None:
+        df = pd.DataFrame({"Journal": ["BMJ"]})
+        out = validate_dataframe_with_llm(df, [SCALAR_CFG], model=_fake_model({}))
+        pd.testing.assert_frame_equal(out, df)
+
+    def test_failed_llm_call_keeps_row(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Journal": ["BMJ", "Lancet"],
+                "Journal sentence": ["published in BMJ", "a general journal"],
+            }
+        )
+
+        def _flaky(prompt_value) -> str:
+            if "Lancet" in prompt_value.to_string():
+                raise RuntimeError("rate limited")
+            return json.dumps({"is_list": False, "supported": False})
+
+        out = validate_dataframe_with_llm(
+            df, [SCALAR_CFG], model=RunnableLambda(_flaky), rows_per_prompt=1
+        )
+        assert pd.isna(out.loc[0, "Journal"])
+        assert out.loc[1, "Journal"] == "Lancet"
+
+    def test_non_range_index_is_written_by_position(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Countries": [["FR"], ["CA", "US"]],
+                "Countries sentence": [["in France"], ["in Canada", "elsewhere"]],
+            },
+            index=["b", "a"],
+        )
+        out = validate_dataframe_with_llm(
+            df, [LIST_CFG], model=_fake_model({"US": False})
+        )
+        assert out.loc["a", "Countries"] == ["CA"]
+        assert out.loc["b", "Countries"] == ["FR"]
+        assert list(out.index) == ["b", "a"]
+
+    def test_verbatim_values_skip_the_llm(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Countries": [["Canada", "France"], ["Canada", "US"]],
+                "Countries sentence": [
+                    ["Patients in Canada", "and in FRANCE"],
+                    ["Patients in Canada", "in the US"],
+                ],
+            }
+        )
+        calls: list[str] = []
+        out = validate_dataframe_with_llm(
+            df,
+            [LIST_CFG],
+            model=_fake_model({"US": False}, calls),
+            skip_contained=True,
+        )
+        # row 0 is fully contained; row 1 has a too-short value ("US")
+        assert len(calls) == 1
+        assert out.loc[0, "Countries"] == ["Canada", "France"]
+        assert out.loc[1, "Countries"] == ["Canada"]
+
+    def test_contained_values_are_validated_by_default(self) -> None:
+        df = pd.DataFrame({"Journal": ["Lancet"], "Journal sentence": ["cited Lancet"]})
+        calls: list[str] = []
+        out = validate_dataframe_with_llm(
+            df, [SCALAR_CFG], model=_fake_model({"Lancet": False}, calls)
+        )
+        assert len(calls) == 1
+        assert pd.isna(out.loc[0, "Journal"])
+
+    def test_multiple_fields_validated_together(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Journal": ["Lancet"],
+                "Journal sentence": ["cited in a review"],
+                "Countries": [["Canada", "Mexico"]],
+                "Countries sentence": [["Patients in Canada", "a neighbour"]],
+            }
+        )
+        out = validate_dataframe_with_llm(
+            df,
+            [SCALAR_CFG, LIST_CFG],
+            model=_fake_model({"Lancet": False, "Mexico": False}),
+            max_parallel_fields=2,
+        )
+        assert pd.isna(out.loc[0, "Journal"])
+        assert out.loc[0, "Countries"] == ["Canada"]
+
+    def test_input_frame_is_not_modified(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Journal": ["Lancet"],
+                "Journal sentence": ["cited in a review"],
+                "Title": ["Untouched"],
+            }
+        )
+        before = df.copy()
+        out = validate_dataframe_with_llm(
+            df, [SCALAR_CFG], model=_fake_model({"Lancet": False})
+        )
+        pd.testing.assert_frame_equal(df, before)
+        assert pd.isna(out.loc[0, "Journal"])
+        assert out.loc[0, "Title"] == "Untouched"
+
+    def test_rows_are_packed_into_prompts(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Journal": ["BMJ", "Lancet", "JAMA"],
+                "Journal sentence": ["a review", "another review", "a third one"],
+            }
+        )
+        calls: list[str] = []
+        out = validate_dataframe_with_llm(
+            df,
+            [SCALAR_CFG],
+            model=_fake_model({"Lancet": False}, calls),
+            rows_per_prompt=2,
+        )
+        assert len(calls) == 2
+        assert list(out["Journal"].isna()) == [False, True, False]
+
+    def test_row_missing_from_multi_row_reply_is_kept(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Journal": ["BMJ", "Lancet"],
+                "Journal sentence": ["a review", "another review"],
+            }
+        )
+        model = _fake_model({"BMJ": False, "Lancet": False}, drop_row_ids={"1"})
+        out = validate_dataframe_with_llm(df, [SCALAR_CFG], model=model)
+        assert pd.isna(out.loc[0, "Journal"])
+        assert out.loc[1, "Journal"] == "Lancet"
+
+    def test_single_row_prompts(self) -> None:
+        df = pd.DataFrame(
+            {
+                "Countries": [["CA", "US"], ["FR"]],
+                "Countries sentence": [["in Canada", "elsewhere"], ["in France"]],
+            }
+        )
+        calls: list[str] = []
+        out = validate_dataframe_with_llm(
+            df,
+            [LIST_CFG],
+            model=_fake_model({"US": False}, calls),
+            rows_per_prompt=1,
+        )
+        assert len(calls) == 2
+        assert out.loc[0, "Countries"] == ["CA"]
+        assert out.loc[1, "Countries"] == ["FR"]
@@ -1,8 +1,10 @@
 """Tests for resume-index helpers in utils/utils.py:
 - file_name_sha1
-- load_existing_index
+- load_existing_index (CSV and Parquet)
+- ParquetAppender
 - drop_empty_rows
-- append_csv_row
+- append_csv_row / CsvAppender
+- read_chunk_meta / write_chunk_meta
 """
 
 from __future__ import annotations
@@ -10,12 +12,19 @@ from __future__ import annotations
 from pathlib import Path
 
 import pandas as pd
+import pyarrow.parquet as pq
+import pytest
 
+import utils.utils as uu
 from utils.utils import (
+    CsvAppender,
+    ParquetAppender,
     append_csv_row,
     drop_empty_rows,
     file_name_sha1,
     load_existing_index,
+    read_chunk_meta,
+    write_chunk_meta,
 )
 
 
@@ -58,6 +67,20 @@ class TestLoadExistingIndex:
         result = load_existing_index(csv_path)
         assert result == {"hash_a", "hash_b", "hash_c"}
 
+    def test_csv_skips_empty_rows_without_rewriting(self, tmp_path: Path) -> None:
+        csv_path = tmp_path / "index.csv"
+        df = pd.DataFrame(
+            {
+                "__source_file__": ["hash_a", None, "hash_c", "hash_d"],
+                "Journal": ["Lancet", "BMJ", "123", None],
+            }
+        )
+        df.to_csv(csv_path, index=False)
+        before = csv_path.read_bytes()
+        result = load_existing_index(csv_path)
+        assert result == frozenset({"hash_a"})
+        assert csv_path.read_bytes() == before
+
 
 # ---------------------------------------------------------------------------
 # drop_empty_rows
@@ -93,6 +116,29 @@ class TestDropEmptyRows:
         assert len(result) == 1
         assert result.iloc[0]["Journal"] == "Lancet"
 
+    def test_same_rows_as_the_indexes(self, tmp_path: Path) -> None:
+        journals = ["123", " 12.5 ", "+3e-2", "", "BMJ", "1.2.3", "Infinity"]
+        df = pd.DataFrame(
+            {
+                "__source_file__": [f"h{i}" for i in range(len(journals))],
+                "Journal": journals,
+            }
+        )
+        kept = ["h4", "h5", "h6"]
+        csv_path = tmp_path / "data.csv"
+        df.to_csv(csv_path, index=False)
+        pq_path = tmp_path / "data.parquet"
+        with ParquetAppender(pq_path) as pw:
+            for row in df.to_dict("records"):
+                pw.append(row)
+        # the CSV and Parquet indexes and both cleanups keep the same rows
+        assert load_existing_index(csv_path) == set(kept)
+        assert load_existing_index(pq_path) == set(kept)
+        drop_empty_rows(csv_path)
+        assert list(pd.read_csv(csv_path)["__source_file__"]) == kept
+        rows = ParquetAppender(pq_path).drop_empty_rows_pq(rewrite=False)
+        assert rows["__source_file__"].to_pylist() == kept
+
     def test_keeps_text_journal(self, tmp_path: Path) -> None:
         csv_path = tmp_path / "data.csv"
         df = pd.DataFrame(
@@ -150,3 +196,204 @@ class TestAppendCsvRow:
         assert list(result.columns) == cols
         assert len(result) == 2
         assert result.iloc[1]["a"] == 4
+
+    def test_empty_existing_file_gets_header(self, tmp_path: Path) -> None:
+        csv_path = tmp_path / "output.csv"
+        csv_path.touch()
+        append_csv_row(csv_path, {"a": 1, "b": 2}, ["a", "b"])
+        result = pd.read_csv(csv_path)
+        assert list(result.columns) == ["a", "b"]
+        assert len(result) == 1
+
+
+class TestCsvAppender:
+    def test_header_written_once_across_runs(self, tmp_path: Path) -> None:
+        csv_path = tmp_path / "output.csv"
+        cols = ["a", "b"]
+        with CsvAppender(csv_path, cols) as cw:
+            cw.append({"a": 1, "b": 2})
+            cw.append({"a": 3, "b": 4, "extra": 5})
+        with CsvAppender(csv_path, cols) as cw:
+            cw.append({"a": 6})
+        result = pd.read_csv(csv_path)
+        assert list(result.columns) == cols
+        assert result["a"].tolist() == [1, 3, 6]
+
+    def test_no_rows_creates_no_file(self, tmp_path: Path) -> None:
+        csv_path = tmp_path / "output.csv"
+        with CsvAppender(csv_path, ["a"]):
+            pass
+        assert not csv_path.exists()
+
+
+# ---------------------------------------------------------------------------
+# Parquet output: ParquetAppender + load_existing_index
+# ---------------------------------------------------------------------------
+
+
+class TestParquetIndex:
+    def test_nonexistent_parquet_returns_empty_set(self, tmp_path: Path) -> None:
+        assert load_existing_index(tmp_path / "missing.parquet") == set()
+
+    def test_reads_source_files_skipping_empty_rows(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_a", "Journal": "BMJ"})
+            pw.append({"__source_file__": "hash_b", "Journal": "123"})
+            pw.append({"__source_file__": "", "Journal": "NEJM"})
+            pw.append({"__source_file__": "hash_c", "Journal": None})
+        # a null Journal means every chunk failed, so hash_c is retried
+        assert load_existing_index(pq_path) == {"hash_a"}
+
+    def test_parquet_and_csv_index_agree(self, tmp_path: Path) -> None:
+        rows = [
+            {"__source_file__": "a", "Journal": "BMJ"},
+            {"__source_file__": "b", "Journal": None},
+            {"__source_file__": "c", "Journal": ""},
+            {"__source_file__": "d", "Journal": "42"},
+        ]
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path) as pw:
+            for row in rows:
+                pw.append(row)
+        csv_path = tmp_path / "index.csv"
+        pd.DataFrame(rows).to_csv(csv_path, index=False)
+        assert load_existing_index(pq_path) == load_existing_index(csv_path) == {"a"}
+
+    def test_appender_keeps_rows_from_previous_run(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_a", "Journal": "BMJ"})
+            pw.append({"__source_file__": "hash_b", "Journal": "Lancet"})
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_c", "Journal": "NEJM"})
+        assert load_existing_index(pq_path) == {"hash_a", "hash_b", "hash_c"}
+
+    def test_empty_rows_from_previous_run_are_dropped(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_a", "Journal": "BMJ"})
+            pw.append({"__source_file__": "", "Journal": "NEJM"})
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_b", "Journal": "Lancet"})
+        table = pq.read_table(pq_path)
+        assert table["__source_file__"].to_pylist() == ["hash_a", "hash_b"]
+
+    def test_sparse_first_row_keeps_later_columns(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        cols = ["Journal", "Title", "Sample size", "__source_file__"]
+        with ParquetAppender(pq_path, columns=cols) as pw:
+            # a failed PDF: only the source key and the post-processed gate
+            pw.append({"__source_file__": "hash_a", "Gate": "No"})
+            pw.append(
+                {
+                    "__source_file__": "hash_b",
+                    "Journal": "BMJ",
+                    "Title": "A trial",
+                    "Sample size": 120,
+                }
+            )
+        table = pq.read_table(pq_path)
+        assert table.column_names == cols
+        assert table.to_pylist()[1] == {
+            "Journal": "BMJ",
+            "Title": "A trial",
+            "Sample size": 120,
+            "__source_file__": "hash_b",
+        }
+
+    def test_schema_widens_across_batches(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path, batch_rows=1) as pw:
+            pw.append({"__source_file__": "hash_a", "Title": None})
+            pw.append({"__source_file__": "hash_b", "Title": "A trial", "N": 3})
+        rows = pq.read_table(pq_path).to_pylist()
+        assert rows == [
+            {"__source_file__": "hash_a", "Title": None, "N": None},
+            {"__source_file__": "hash_b", "Title": "A trial", "N": 3},
+        ]
+
+    def test_killed_run_keeps_previous_output(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_a", "Journal": "BMJ"})
+        # a hard kill: a batch is written but __exit__ never runs
+        pw = ParquetAppender(pq_path, batch_rows=1)
+        pw.append({"__source_file__": "hash_b", "Journal": "Lancet"})
+        assert load_existing_index(pq_path) == {"hash_a"}
+        # the next run starts from the intact file
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_c", "Journal": "NEJM"})
+        assert load_existing_index(pq_path) == {"hash_a", "hash_c"}
+
+    def test_failed_run_keeps_previous_output(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path) as pw:
+            pw.append({"__source_file__": "hash_a", "Journal": "BMJ"})
+        with pytest.raises(RuntimeError):
+            with ParquetAppender(pq_path, batch_rows=1) as pw:
+                pw.append({"__source_file__": "hash_b", "Journal": "Lancet"})
+                raise RuntimeError("run aborted")
+        assert load_existing_index(pq_path) == {"hash_a"}
+        assert not pq_path.with_name(pq_path.name + ".tmp").exists()
+
+    def test_failed_write_keeps_buffered_rows(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        pw = ParquetAppender(tmp_path / "index.parquet", batch_rows=2)
+        pw.append({"__source_file__": "hash_a", "Journal": "BMJ"})
+
+        def _boom(table, schema):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(uu, "table_cast_like", _boom)
+        with pytest.raises(OSError):
+            pw.append({"__source_file__": "hash_b", "Journal": "Lancet"})
+        assert len(pw._buffer) == 2
+
+    def test_rows_are_written_in_batches(self, tmp_path: Path) -> None:
+        pq_path = tmp_path / "index.parquet"
+        with ParquetAppender(pq_path, batch_rows=2) as pw:
+            for i in range(5):
+                pw.append({"__source_file__": f"hash_{i}", "Journal": "BMJ"})
+        # two full batches plus the remainder flushed on exit
+        assert pq.ParquetFile(pq_path).metadata.num_row_groups == 3
+        assert load_existing_index(pq_path) == {f"hash_{i}" for i in range(5)}
+
+
+# ---------------------------------------------------------------------------
+# read_chunk_meta / write_chunk_meta
+# ---------------------------------------------------------------------------
+
+
+class TestChunkMeta:
+    def _md(self, tmp_path: Path, text: str = "# chunk\n" * 20) -> Path:
+        md = tmp_path / "paper_1.md"
+        md.write_text(text, encoding="utf-8")
+        return md
+
+    def test_round_trip(self, tmp_path: Path) -> None:
+        md = self._md(tmp_path)
+        row = {"Journal": "BMJ", "Countries": ["CA", "US"]}
+        write_chunk_meta(md, "hash_a", 8, row)
+        assert read_chunk_meta(md, "hash_a", 8) == row
+
+    def test_missing_sidecar_returns_none(self, tmp_path: Path) -> None:
+        md = self._md(tmp_path)
+        assert read_chunk_meta(md, "hash_a", 8) is None
+
+    def test_mismatched_source_or_chunk_returns_none(self, tmp_path: Path) -> None:
+        md = self._md(tmp_path)
+        write_chunk_meta(md, "hash_a", 8, {"Journal": "BMJ"})
+        assert read_chunk_meta(md, "hash_b", 8) is None
+        assert read_chunk_meta(md, "hash_a", 16) is None
+
+    def test_small_markdown_is_not_trusted(self, tmp_path: Path) -> None:
+        md = self._md(tmp_path, "x")
+        write_chunk_meta(md, "hash_a", 0, {"Journal": "BMJ"})
+        assert read_chunk_meta(md, "hash_a", 0, min_md_bytes=64) is None
+
+    def test_corrupt_sidecar_returns_none(self, tmp_path: Path) -> None:
+        md = self._md(tmp_path)
+        (tmp_path / "paper_1.meta.json").write_text("{not json", encoding="utf-8")
+        assert read_chunk_meta(md, "hash_a", 0) is None
@@ -0,0 +1,54 @@
+"""Tests for layout-based cut detection in pre_processing/pdf_section_stripper."""
+
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import fitz
+import pytest
+
+# the stripper imports itself as the top-level `pdf_section_stripper` package
+sys.path.append(str(Path(__file__).resolve().parent.parent / "pre_processing"))
+
+from pdf_section_stripper.config import StripConfig  # noqa: E402
+from pdf_section_stripper.pipeline import detect_cuts_from_layout  # noqa: E402
+
+BODY = "Body text of the section, set in the regular font size."
+
+
+@pytest.fixture
+def paper() -> fitz.Document:
+    headings = [
+        "Title page",
+        "Abstract",
+        "Introduction",
+        "Methods",
+        "Results",
+        "Acknowledgements",
+        "References",
+        "Supplementary Appendix",
+        "References",
+    ]
+    doc = fitz.open()
+    for heading in headings:
+        page = doc.new_page()
+        page.insert_text((72, 72), heading, fontsize=16)
+        for k in range(6):
+            page.insert_text((72, 110 + 14 * k), BODY, fontsize=10)
+    yield doc
+    doc.close()
+
+
+class TestDetectCutsFromLayout:
+    def test_first_references_heading_defines_the_cut(
+        self, paper: fitz.Document
+    ) -> None:
+        cuts = detect_cuts_from_layout(paper, StripConfig())
+        assert cuts.ack_start == 5
+        assert cuts.refs_start == 6
+
+    def test_early_pages_give_intro_and_methods(self, paper: fitz.Document) -> None:
+        cuts = detect_cuts_from_layout(paper, StripConfig())
+        assert cuts.intro_start == 2
+        assert cuts.methods_start == 3
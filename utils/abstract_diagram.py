@@ -2,11 +2,9 @@
 from __future__ import annotations
 
 import importlib
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from diagrams import Diagram, Cluster
-from diagrams.custom import Custom
-
 
 def pick_icon_any(choices: list[tuple[str, list[str]]]):
     last_err = None
@@ -32,79 +30,63 @@ def pick_icon_any(choices: list[tuple[str, list[str]]]):
 # ---------------------------------------------------------------------
 # Paper-safe, vendor-neutral, nicer icon palette
 # ---------------------------------------------------------------------
-PDF = pick_icon_any(
-    [
+# icon name -> pick_icon_any choices; each is resolved on first use
+_ICON_SPECS: dict[str, list[tuple[str, list[str]]]] = {
+    "PDF": [
         ("diagrams.generic.storage", ["Storage"]),
         ("diagrams.generic.storage", ["Disk"]),
-    ]
-)
-
-Artifact = pick_icon_any(
-    [
+    ],
+    "Artifact": [
         ("diagrams.generic.storage", ["Storage"]),
         ("diagrams.generic.storage", ["Disk"]),
-    ]
-)
-
-SQL = pick_icon_any(
-    [
+    ],
+    "SQL": [
         ("diagrams.onprem.database", ["Postgresql", "Mysql", "Mongodb"]),
         ("diagrams.generic.database", ["SQL", "Database"]),
-    ]
-)
-
-PythonStep = pick_icon_any(
-    [
+    ],
+    "PythonStep": [
         ("diagrams.programming.language", ["Python"]),
         ("diagrams.onprem.compute", ["Server", "VM", "Baremetal"]),
         ("diagrams.generic.compute", ["Rack", "Server"]),
-    ]
-)
-
-Service = pick_icon_any(
-    [
+    ],
+    "Service": [
         ("diagrams.onprem.compute", ["Server", "VM", "Baremetal"]),
         ("diagrams.generic.compute", ["Rack", "Server"]),
-    ]
-)
-
-Orchestrator = pick_icon_any(
-    [
+    ],
+    "Orchestrator": [
         ("diagrams.onprem.workflow", ["Airflow", "Nifi"]),
-    ]
-)
-
-Queue = pick_icon_any(
-    [
+    ],
+    "Queue": [
         ("diagrams.onprem.queue", ["Rabbitmq", "Kafka"]),
-    ]
-)
-
-Gate = pick_icon_any(
-    [
+    ],
+    "Gate": [
         ("diagrams.generic.network", ["Firewall", "Router", "Switch"]),
-    ]
-)
-
-Decision = pick_icon_any(
-    [
+    ],
+    "Decision": [
         ("diagrams.generic.network", ["LoadBalancer", "Router", "Switch"]),
-    ]
-)
-
-Analytics = pick_icon_any(
-    [
+    ],
+    "Analytics": [
         ("diagrams.onprem.analytics", ["Spark", "Flink"]),
         ("diagrams.generic.compute", ["Rack", "Server"]),
-    ]
-)
-
-Report = pick_icon_any(
-    [
+    ],
+    "Report": [
         ("diagrams.onprem.analytics", ["Superset", "Spark"]),
         ("diagrams.generic.storage", ["Storage"]),
-    ]
-)
+    ],
+}
+
+
+def __getattr__(name: str):
+    """Resolve an icon on first access (PEP 562) and keep it as a global."""
+    if name in _ICON_SPECS:
+        icon = globals()[name] = pick_icon_any(_ICON_SPECS[name])
+        return icon
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _icons(*names: str) -> list:
+    """The named icons, resolved through __getattr__ on first use."""
+    return [globals().get(name) or __getattr__(name) for name in names]
 
 
 # ---------------------------------------------------------------------
@@ -117,6 +99,8 @@ if not MISTRAL_ICON.exists():
 
 
 def MistralOCR(label):
+    from diagrams.custom import Custom
+
     return Custom(label, MISTRAL_ICON.as_posix())
 
 
@@ -154,127 +138,167 @@ COMMON_CLUSTER_ATTR = {
 # ---------------------------
 # 1. INGESTION (COMPACT)
 # ---------------------------
-with Diagram(
-    "PDF Corpus Processing and Annotation Flow",
-    show=False,
-    direction="LR",
-    filename="output/charts_and_excels/pdf_corpus_flow_ingestion",
-    outformat="png",
-    graph_attr=COMMON_GRAPH_ATTR,
-    node_attr=COMMON_NODE_ATTR,
-    edge_attr=COMMON_EDGE_ATTR,
-):
-    with Cluster("1. Ingestion and Resume Logic", graph_attr=COMMON_CLUSTER_ATTR):
-        ingest = PDF("Load PDF corpus\n+ read bytes")
-        fingerprints = PythonStep("Fingerprint\n(SHA1 + page count)")
-        validate = Decision("Valid PDF?")
-        skip_bad = PythonStep("Skip invalid")
-
-        encode = PythonStep("Encode\n(base64)")
-        resume_idx = SQL("Resume index\n(SQL)")
-        seen = Decision("Already processed?")
-        skip_resume = PythonStep("Skip (resume)")
-        to_chunking = Service("Proceed to\nchunking")
-
-        ingest >> fingerprints >> validate
-        validate >> skip_bad
-        validate >> encode >> resume_idx >> seen
-        seen >> skip_resume
-        seen >> to_chunking
+def build_ingestion():
+    from diagrams import Cluster, Diagram
+
+    PDF, SQL, PythonStep, Service, Decision = _icons(
+        "PDF", "SQL", "PythonStep", "Service", "Decision"
+    )
+    with Diagram(
+        "PDF Corpus Processing and Annotation Flow",
+        show=False,
+        direction="LR",
+        filename="output/charts_and_excels/pdf_corpus_flow_ingestion",
+        outformat="png",
+        graph_attr=COMMON_GRAPH_ATTR,
+        node_attr=COMMON_NODE_ATTR,
+        edge_attr=COMMON_EDGE_ATTR,
+    ):
+        with Cluster("1. Ingestion and Resume Logic", graph_attr=COMMON_CLUSTER_ATTR):
+            ingest = PDF("Load PDF corpus\n+ read bytes")
+            fingerprints = PythonStep("Fingerprint\n(SHA1 + page count)")
+            validate = Decision("Valid PDF?")
+            skip_bad = PythonStep("Skip invalid")
+
+            encode = PythonStep("Encode\n(base64)")
+            resume_idx = SQL("Resume index\n(SQL)")
+            seen = Decision("Already processed?")
+            skip_resume = PythonStep("Skip (resume)")
+            to_chunking = Service("Proceed to\nchunking")
+
+            ingest >> fingerprints >> validate
+            validate >> skip_bad
+            validate >> encode >> resume_idx >> seen
+            seen >> skip_resume
+            seen >> to_chunking
 
 
 # ---------------------------
 # 2. CHUNKING (COMPACT)
 # ---------------------------
-with Diagram(
-    "PDF Corpus Processing and Annotation Flow",
-    show=False,
-    direction="LR",
-    filename="output/charts_and_excels/pdf_corpus_flow_chunking",
-    outformat="png",
-    graph_attr=COMMON_GRAPH_ATTR,
-    node_attr=COMMON_NODE_ATTR,
-    edge_attr=COMMON_EDGE_ATTR,
-):
-    with Cluster("2. Chunking and Async Scheduling", graph_attr=COMMON_CLUSTER_ATTR):
-        chunk_decision = Decision("Fits in one chunk?")
-        single = PythonStep("Single submission")
-        multi = PythonStep("Partition pages\ninto chunks")
-
-        schedule = Orchestrator("Async scheduler")
-        gate = Gate("Concurrency\n+ throttling")
-        q = Queue("Work queue")
-        dispatch = Service("Dispatch to OCR")
-
-        to_chunking >> chunk_decision
-        chunk_decision >> single >> schedule
-        chunk_decision >> multi >> schedule
-        schedule >> gate >> q >> dispatch
+def build_chunking():
+    from diagrams import Cluster, Diagram
+
+    PythonStep, Service, Orchestrator, Queue, Gate, Decision = _icons(
+        "PythonStep", "Service", "Orchestrator", "Queue", "Gate", "Decision"
+    )
+    with Diagram(
+        "PDF Corpus Processing and Annotation Flow",
+        show=False,
+        direction="LR",
+        filename="output/charts_and_excels/pdf_corpus_flow_chunking",
+        outformat="png",
+        graph_attr=COMMON_GRAPH_ATTR,
+        node_attr=COMMON_NODE_ATTR,
+        edge_attr=COMMON_EDGE_ATTR,
+    ):
+        with Cluster(
+            "2. Chunking and Async Scheduling", graph_attr=COMMON_CLUSTER_ATTR
+        ):
+            chunk_decision = Decision("Fits in one chunk?")
+            single = PythonStep("Single submission")
+            multi = PythonStep("Partition pages\ninto chunks")
+
+            schedule = Orchestrator("Async scheduler")
+            gate = Gate("Concurrency\n+ throttling")
+            q = Queue("Work queue")
+            dispatch = Service("Dispatch to OCR")
+
+            chunk_decision >> single >> schedule
+            chunk_decision >> multi >> schedule
+            schedule >> gate >> q >> dispatch
 
 
 # ---------------------------
 # 3. OCR + EXTRACTION (COMPACT)
 # ---------------------------
-with Diagram(
-    "PDF Corpus Processing and Annotation Flow",
-    show=False,
-    direction="LR",
-    filename="output/charts_and_excels/pdf_corpus_flow_ocr",
-    outformat="png",
-    graph_attr=COMMON_GRAPH_ATTR,
-    node_attr=COMMON_NODE_ATTR,
-    edge_attr=COMMON_EDGE_ATTR,
-):
-    with Cluster(
-        "3. Mistral OCR and Schema Extraction", graph_attr=COMMON_CLUSTER_ATTR
+def build_ocr():
+    from diagrams import Cluster, Diagram
+
+    SQL, PythonStep, Gate, Decision = _icons("SQL", "PythonStep", "Gate", "Decision")
+    with Diagram(
+        "PDF Corpus Processing and Annotation Flow",
+        show=False,
+        direction="LR",
+        filename="output/charts_and_excels/pdf_corpus_flow_ocr",
+        outformat="png",
+        graph_attr=COMMON_GRAPH_ATTR,
+        node_attr=COMMON_NODE_ATTR,
+        edge_attr=COMMON_EDGE_ATTR,
     ):
-        prep = PythonStep("Prepare requests\n+ schemas")
-        rate = Gate("Rate-limit\n+ retries")
-        ocr = MistralOCR("Mistral OCR\n(page chunks)")
-        err = Decision("Error / limit?")
-        backoff = PythonStep("Backoff\n+ retry")
+        with Cluster(
+            "3. Mistral OCR and Schema Extraction", graph_attr=COMMON_CLUSTER_ATTR
+        ):
+            prep = PythonStep("Prepare requests\n+ schemas")
+            rate = Gate("Rate-limit\n+ retries")
+            ocr = MistralOCR("Mistral OCR\n(page chunks)")
+            err = Decision("Error / limit?")
+            backoff = PythonStep("Backoff\n+ retry")
 
-        parse = PythonStep("Parse outputs\n+ evidence linking\n(captions/body/images)")
-        chunk_payloads = SQL("Chunk payloads\n(SQL dicts)")
+            parse = PythonStep(
+                "Parse outputs\n+ evidence linking\n(captions/body/images)"
+            )
+            chunk_payloads = SQL("Chunk payloads\n(SQL dicts)")
 
-        dispatch >> prep >> rate >> ocr >> err
-        err >> backoff >> rate
-        err >> parse >> chunk_payloads
+            prep >> rate >> ocr >> err
+            err >> backoff >> rate
+            err >> parse >> chunk_payloads
 
 
 # ---------------------------
 # 4–7. MERGE + OUTPUTS (COMPACT)
 # ---------------------------
-with Diagram(
-    "PDF Corpus Processing and Annotation Flow",
-    show=False,
-    direction="LR",
-    filename="output/charts_and_excels/pdf_corpus_flow_merging",
-    outformat="png",
-    graph_attr=COMMON_GRAPH_ATTR,
-    node_attr=COMMON_NODE_ATTR,
-    edge_attr=COMMON_EDGE_ATTR,
-):
-    with Cluster("4. Merge to Study-level", graph_attr=COMMON_CLUSTER_ATTR):
-        collect = SQL("Collect chunks\n(SQL)")
-        merge = PythonStep("Merge\n(scalars, lists,\n sentence evidence)")
-        study = SQL("Study-level\nannotation")
-        attach = Artifact("Attach metadata\n+ source key")
-
-        chunk_payloads >> collect >> merge >> study >> attach
-
-    with Cluster("5. Tabular Outputs", graph_attr=COMMON_CLUSTER_ATTR):
-        tabular = Artifact("CSV + Parquet")
-        dataset = SQL("Final dataset\n(schema-conforming)")
-        attach >> tabular >> dataset
-
-    with Cluster("6. Markdown Reconstruction", graph_attr=COMMON_CLUSTER_ATTR):
-        md = Artifact(
-            "Study markdown\n(text + captions + images)\n+ structured summary"
-        )
-        attach >> md
+def build_merging():
+    from diagrams import Cluster, Diagram
+
+    Artifact, SQL, PythonStep, Analytics, Report = _icons(
+        "Artifact", "SQL", "PythonStep", "Analytics", "Report"
+    )
+    with Diagram(
+        "PDF Corpus Processing and Annotation Flow",
+        show=False,
+        direction="LR",
+        filename="output/charts_and_excels/pdf_corpus_flow_merging",
+        outformat="png",
+        graph_attr=COMMON_GRAPH_ATTR,
+        node_attr=COMMON_NODE_ATTR,
+        edge_attr=COMMON_EDGE_ATTR,
+    ):
+        with Cluster("4. Merge to Study-level", graph_attr=COMMON_CLUSTER_ATTR):
+            collect = SQL("Collect chunks\n(SQL)")
+            merge = PythonStep("Merge\n(scalars, lists,\n sentence evidence)")
+            study = SQL("Study-level\nannotation")
+            attach = Artifact("Attach metadata\n+ source key")
+
+            collect >> merge >> study >> attach
+
+        with Cluster("5. Tabular Outputs", graph_attr=COMMON_CLUSTER_ATTR):
+            tabular = Artifact("CSV + Parquet")
+            dataset = SQL("Final dataset\n(schema-conforming)")
+            attach >> tabular >> dataset
+
+        with Cluster("6. Markdown Reconstruction", graph_attr=COMMON_CLUSTER_ATTR):
+            md = Artifact(
+                "Study markdown\n(text + captions + images)\n+ structured summary"
+            )
+            attach >> md
+
+        with Cluster("7. Post-processing", graph_attr=COMMON_CLUSTER_ATTR):
+            post = Analytics("Aggregation\n+ stratification\n+ value counts")
+            excel = Report("Excel workbook\n+ distributions")
+            dataset >> post >> excel
+
+
+# the diagrams share no nodes, so their Graphviz renders can run side by side
+DIAGRAM_BUILDERS = (build_ingestion, build_chunking, build_ocr, build_merging)
+
+
+def main():
+    # each render waits on a `dot` subprocess, so threads overlap them
+    with ThreadPoolExecutor(max_workers=len(DIAGRAM_BUILDERS)) as pool:
+        for future in [pool.submit(build) for build in DIAGRAM_BUILDERS]:
+            future.result()
+
 
-    with Cluster("7. Post-processing", graph_attr=COMMON_CLUSTER_ATTR):
-        post = Analytics("Aggregation\n+ stratification\n+ value counts")
-        excel = Report("Excel workbook\n+ distributions")
-        dataset >> post >> excel
+if __name__ == "__main__":
+    main()
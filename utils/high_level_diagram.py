@@ -2,7 +2,6 @@
 from __future__ import annotations
 
 import importlib
-from diagrams import Diagram, Edge
 
 
 def pick_icon_any(choices: list[tuple[str, list[str]]]):
@@ -32,39 +31,44 @@ def pick_icon_any(choices: list[tuple[str, list[str]]]):
 # ---------------------------
 # Paper-safe, vendor-neutral icons (no AWS/GCP/Azure)
 # ---------------------------
-# PDF / file artifact
-PDF = pick_icon_any(
-    [
+# icon name -> pick_icon_any choices; each is resolved on first use
+_ICON_SPECS: dict[str, list[tuple[str, list[str]]]] = {
+    # PDF / file artifact
+    "PDF": [
         ("diagrams.generic.storage", ["Storage"]),
         ("diagrams.generic.storage", ["Disk"]),
-    ]
-)
-
-# Pipeline core (Python)
-Python = pick_icon_any(
-    [
+    ],
+    # Pipeline core (Python)
+    "Python": [
         ("diagrams.programming.language", ["Python"]),
         ("diagrams.onprem.compute", ["Server", "VM", "Baremetal"]),
         ("diagrams.generic.compute", ["Rack", "Server"]),
-    ]
-)
-
-# Structured data output (SQL-ish / dataset)
-Structured = pick_icon_any(
-    [
+    ],
+    # Structured data output (SQL-ish / dataset)
+    "Structured": [
         ("diagrams.generic.database", ["SQL", "Database"]),
         ("diagrams.onprem.database", ["Postgresql", "Mysql"]),
-    ]
-)
-
-# Excel report output (best neutral “file/report” icon available)
-Excel = pick_icon_any(
-    [
+    ],
+    # Excel report output (best neutral “file/report” icon available)
+    "Excel": [
         ("diagrams.onprem.analytics", ["Superset"]),  # if present, looks like reporting
         ("diagrams.generic.storage", ["Storage"]),
         ("diagrams.generic.storage", ["Disk"]),
-    ]
-)
+    ],
+}
+
+
+def __getattr__(name: str):
+    """Resolve an icon on first access (PEP 562) and keep it as a global."""
+    if name in _ICON_SPECS:
+        icon = globals()[name] = pick_icon_any(_ICON_SPECS[name])
+        return icon
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _icons(*names: str) -> list:
+    """The named icons, resolved through __getattr__ on first use."""
+    return [globals().get(name) or __getattr__(name) for name in names]
 
 
 COMMON_GRAPH_ATTR = {
@@ -89,6 +93,9 @@ COMMON_EDGE_ATTR = {
 
 
 def main():
+    from diagrams import Diagram, Edge
+
+    PDF, Python, Structured, Excel = _icons("PDF", "Python", "Structured", "Excel")
     ink = "#1f4e79"
 
     with Diagram(
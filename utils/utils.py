@@ -1,9 +1,11 @@
-import base64
-import aiofiles
+import csv
 import io
 import os
 import json
 from collections.abc import Mapping
+from concurrent.futures import Executor
+from functools import lru_cache
+from itertools import chain
 from typing import Any, Iterable, List
 from pypdf import PdfReader, PdfWriter
 import fitz as pymupdf
@@ -12,16 +14,50 @@ import re
 import hashlib
 from pathlib import Path
 from loguru import logger
+import orjson
 import pyarrow as pa
 import pyarrow.parquet as pq
 import pyarrow.compute as pc
+from pyarrow import csv as pacsv
 from pyarrow import types as pat
-import pandas as pd
+
+try:
+    # SIMD (SSSE3/AVX2) encoder, several times faster than the stdlib on large PDFs
+    from pybase64 import b64encode, b64encode_as_string
+except ImportError:
+    from base64 import b64encode
+
+    def b64encode_as_string(s: bytes) -> str:
+        return b64encode(s).decode("ascii")
+
+
+# PDFs above this size are base64-encoded block by block
+B64_STREAM_THRESHOLD = 16 * 1024 * 1024
+# multiple of 3 so no '=' padding is emitted mid-stream
+B64_BLOCK_SIZE = 3 * 1024 * 1024
+# cap on rows per Parquet row group (pyarrow's default is 1Mi rows), so files
+# carried over between runs keep row groups small enough to skip on scans
+PARQUET_ROW_GROUP_ROWS = 64 * 1024
+# shared by every Parquet write so a cleaned or carried-over file is encoded
+# like freshly appended rows; zstd level 3 keeps compression CPU well below
+# the time spent waiting on OCR (pyarrow's 1 MiB data pages are kept)
+_PARQUET_WRITE_OPTIONS: dict[str, Any] = {
+    "use_dictionary": True,
+    "compression": "zstd",
+    "compression_level": 3,
+    "write_statistics": True,
+}
 
 REF_HEADER_RE = re.compile(
     r"(?i)^\s*(references?|bibliography|works\s+cited)\s*:?\s*$",
     re.MULTILINE,
 )
+# every REF_HEADER_RE match contains one of these (lowercased)
+_REF_HEADER_KEYWORDS = ("referenc", "bibliograph", "cited")
+# a 'Journal' value like '123', '  12.5  ' or '+3e-2' marks a junk row; the
+# Arrow (RE2) and pandas filters all use this one pattern, which leaves words
+# such as 'inf' or 'nan' alone
+_NUMERIC_STR_RE = r"^\s*[+-]?(?:\d+(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?\s*$"
 
 
 def _repair_pdf_bytes(raw: bytes) -> bytes:
@@ -50,6 +86,34 @@ def _repair_pdf_bytes(raw: bytes) -> bytes:
         return raw  # return original if repair fails
 
 
+def _encode_pdf_sync(pdf_path: str | Path) -> str:
+    size = os.path.getsize(pdf_path)
+    with open(pdf_path, "rb") as pdf_file:
+        if size <= B64_STREAM_THRESHOLD:
+            # pybase64 encodes straight into the str, skipping the bytes copy
+            return b64encode_as_string(pdf_file.read())
+
+        # encode into an output buffer sized up front, reading every block
+        # into one reused input buffer, so neither side reallocates per block
+        encoded = bytearray(4 * ((size + 2) // 3))
+        block = bytearray(B64_BLOCK_SIZE)
+        view = memoryview(block)
+        pos = 0
+        while True:
+            # fill the whole block: a short read mid-file would otherwise put
+            # '=' padding in the middle of the stream
+            n = 0
+            while n < len(block) and (got := pdf_file.readinto(view[n:])):
+                n += got
+            if not n:
+                break
+            chunk = b64encode(view[:n])
+            encoded[pos : pos + len(chunk)] = chunk
+            pos += len(chunk)
+        del encoded[pos:]  # the file may have shrunk since it was stat'ed
+        return encoded.decode("ascii")
+
+
 async def encode_pdf(pdf_path: str | Path) -> str | None:
     """Asynchronously encode a PDF file to base64.
 
@@ -57,15 +121,16 @@ async def encode_pdf(pdf_path: str | Path) -> str | None:
     applied here because it strips fonts/metadata that Mistral uses for
     extraction. The image-based fallback in get_annotations handles the
     rare PDFs that Mistral's parser rejects.
+
+    Reading and encoding both run in a worker thread so large PDFs never
+    block the event loop.
     """
     try:
         if not os.path.exists(pdf_path):
             logger.error(f"The file {pdf_path} was not found.")
             return None
 
-        async with aiofiles.open(pdf_path, "rb") as pdf_file:
-            data = await pdf_file.read()
-            return base64.b64encode(data).decode("utf-8")
+        return await asyncio.to_thread(_encode_pdf_sync, pdf_path)
 
     except FileNotFoundError:
         logger.error(f"The file {pdf_path} was not found.")
@@ -75,46 +140,128 @@ async def encode_pdf(pdf_path: str | Path) -> str | None:
         return None
 
 
-async def get_pdf_page_count(path: str | Path) -> int:
-    def _count():
-        with open(path, "rb") as f:
-            reader = PdfReader(f)
-            for i, page in enumerate(reader.pages):
-                try:
-                    txt = page.extract_text() or ""
-                except Exception:
-                    txt = ""
-                if REF_HEADER_RE.search(txt):
-                    return i
-            return len(reader.pages)
+# resolved path -> (mtime_ns, size, page count); an edited file is re-scanned
+_PAGE_COUNT_CACHE: dict[str, tuple[int, int, int]] = {}
+
+
+def load_page_counts(cache_path: Path) -> None:
+    """Seed the page-count memo from a file written by save_page_counts."""
+    try:
+        data = json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    if not isinstance(data, dict):
+        return
+    for key, entry in data.items():
+        if (
+            isinstance(entry, list)
+            and len(entry) == 3
+            and all(isinstance(v, int) for v in entry)
+        ):
+            _PAGE_COUNT_CACHE.setdefault(key, tuple(entry))
+
+
+def save_page_counts(cache_path: Path) -> None:
+    """Persist the page-count memo so the next run skips the References scans."""
+    tmp_path = cache_path.with_suffix(".tmp")
+    try:
+        tmp_path.write_text(json.dumps(_PAGE_COUNT_CACHE), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+    except Exception as e:
+        logger.warning(f"Could not write page counts {cache_path}: {e}")
 
-    return await asyncio.to_thread(_count)
 
+def _count_pages_before_refs(path: str | Path) -> int:
+    """Index of the first page with a References header, else the page count.
 
-def _merge_values(a: Any, b: Any) -> Any:
-    def _normalize_str(x):
-        return x.strip() if isinstance(x, str) else x
+    A "References" bookmark gives the page without extracting any text;
+    otherwise pages are scanned with MuPDF's C text extraction (pypdf's
+    pure-Python extract_text was the bulk of the scan).
+    """
+    with pymupdf.open(path) as doc:
+        try:
+            toc = doc.get_toc(simple=True)  # [[level, title, page], ...], 1-based
+        except Exception:
+            toc = []
+        for _, title, page_no in toc:
+            if 0 < page_no <= doc.page_count and REF_HEADER_RE.match(title.strip()):
+                return page_no - 1
+
+        for i, page in enumerate(doc):
+            try:
+                txt = page.get_text("text")
+            except Exception:
+                txt = ""
+            # plain substring checks rule out most pages before the regex runs
+            low = txt.lower()
+            if not any(k in low for k in _REF_HEADER_KEYWORDS):
+                continue
+            if REF_HEADER_RE.search(txt):
+                return i
+        return doc.page_count
+
+
+async def get_pdf_page_count(path: str | Path, executor: Executor | None = None) -> int:
+    """Number of pages to OCR: the index of the References page, else all pages.
+
+    Memoised per file version, since the scan extracts every page's text;
+    load_page_counts / save_page_counts carry the memo across runs.
+    MuPDF holds the GIL while extracting, so pass a process pool as `executor`
+    to scan several PDFs in parallel; by default the scan runs in a thread.
+    """
+    st = os.stat(path)
+    key = str(Path(path).resolve())
+    hit = _PAGE_COUNT_CACHE.get(key)
+    if hit is not None and hit[:2] == (st.st_mtime_ns, st.st_size):
+        return hit[2]
+
+    if executor is not None:
+        count = await asyncio.get_running_loop().run_in_executor(
+            executor, _count_pages_before_refs, str(path)
+        )
+    else:
+        count = await asyncio.to_thread(_count_pages_before_refs, path)
+    _PAGE_COUNT_CACHE[key] = (st.st_mtime_ns, st.st_size, count)
+    return count
+
+
+def _dedup_key(x: Any) -> Any:
+    """Hashable identity of a list item for dedup.
+
+    Scalars key on (type, value), so 1, 1.0 and True stay distinct; dicts and
+    lists key on their canonical (sorted-key) orjson bytes.
+    """
+    if isinstance(x, (dict, list)):
+        try:
+            return orjson.dumps(
+                x, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+            )
+        except TypeError:
+            return json.dumps(x, sort_keys=True, ensure_ascii=False, default=repr)
+    try:
+        hash(x)
+    except TypeError:
+        return repr(x)
+    return (type(x), x)
+
+
+def _is_empty(v: Any) -> bool:
+    return v in (None, "", [], {})
 
-    def _is_empty(v: Any) -> bool:
-        return v in (None, "", [], {})
 
-    a = _normalize_str(a)
-    b = _normalize_str(b)
+def _merge_values(a: Any, b: Any) -> Any:
+    if isinstance(a, str):
+        a = a.strip()
+    if isinstance(b, str):
+        b = b.strip()
     if _is_empty(a):
         return b
     if isinstance(a, list) and isinstance(b, list):
-        seen: set[str] = set()
-        out: list[Any] = []
-        for x in a + b:
-            key = (
-                json.dumps(x, sort_keys=True, ensure_ascii=False)
-                if isinstance(x, (dict, list))
-                else repr(x)
-            )
-            if key not in seen:
-                seen.add(key)
-                out.append(x)
-        return out
+        # insertion-ordered dedup: one dict instead of a set plus a list
+        out: dict[Any, Any] = {}
+        for x in chain(a, b):
+            out.setdefault(_dedup_key(x), x)
+        return list(out.values())
     if isinstance(a, Mapping) and isinstance(b, Mapping):
         return merge_dicts([dict(a), dict(b)])
     return a
@@ -138,117 +285,323 @@ def merge_dicts(dicts: Iterable[dict[str, Any]]) -> dict[str, Any]:
     return merged
 
 
-# Backward-compatible async wrapper (calls sync merge under the hood)
+# Backward-compatible async wrapper; merging is pure CPU work, so new code
+# should call merge_dicts directly instead of awaiting a coroutine per merge
 async def merge_multiple_dicts_async(dicts: Iterable[dict[str, Any]]) -> dict[str, Any]:
     """Async wrapper around merge_dicts for backward compatibility."""
     return merge_dicts(dicts)
 
 
+@lru_cache(maxsize=4096)
 def file_name_sha1(name: str) -> str:
-    """Hash filename for resume-mode identity tracking. Uses SHA256 despite the name."""
+    """Hash filename for resume-mode identity tracking. Uses SHA256 despite the name.
+
+    Cached: the resume filter and process_one_pdf both hash every PDF name.
+    """
     return hashlib.sha256(name.encode("utf-8")).hexdigest()
 
 
+# ---------- Per-chunk resume sidecars ----------
+def chunk_meta_path(md_path: Path) -> Path:
+    return md_path.with_suffix(".meta.json")
+
+
+def write_chunk_meta(md_path: Path, source_key: str, chunk_start: int, row: dict):
+    """Persist a chunk's annotation row next to its markdown file.
+
+    Written atomically (tmp + replace) so an interrupted run never leaves a
+    truncated sidecar behind.
+    """
+    meta_path = chunk_meta_path(md_path)
+    tmp_path = meta_path.with_suffix(".tmp")
+    try:
+        payload = {"source": source_key, "chunk_start": chunk_start, "row": row}
+        tmp_path.write_text(
+            json.dumps(payload, ensure_ascii=False, default=str), encoding="utf-8"
+        )
+        os.replace(tmp_path, meta_path)
+    except Exception as e:
+        logger.warning(f"Could not write chunk sidecar {meta_path}: {e}")
+
+
+def read_chunk_meta(
+    md_path: Path, source_key: str, chunk_start: int, min_md_bytes: int = 0
+) -> dict | None:
+    """Return the cached row for a completed chunk, or None if it must be redone.
+
+    A chunk counts as done when its markdown exceeds ``min_md_bytes`` and the
+    sidecar belongs to the same (source, chunk_start).
+    """
+    try:
+        if md_path.stat().st_size <= min_md_bytes:
+            return None
+        meta = json.loads(chunk_meta_path(md_path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if (
+        not isinstance(meta, dict)
+        or meta.get("source") != source_key
+        or meta.get("chunk_start") != chunk_start
+        or not isinstance(meta.get("row"), dict)
+    ):
+        return None
+    return meta["row"]
+
+
 # ---------- Realtime writers ----------
 def append_csv_row(csv_path: Path, row: dict, cols: List[str]):
     try:
-        exists = csv_path.exists()
-        df = pd.DataFrame([row], columns=cols)
-        df.to_csv(csv_path, mode="a", header=not exists, index=False)
+        # plain csv writer: no per-row DataFrame; keys outside cols are ignored
+        with open(csv_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=cols, extrasaction="ignore")
+            # append mode starts at EOF, so 0 means a new or empty file
+            if f.tell() == 0:
+                writer.writeheader()
+            writer.writerow(row)
     except Exception as e:
         logger.error(f"Error appending row to {csv_path}: {e}")
         raise e
 
 
+class CsvAppender:
+    """
+    Incremental CSV writer mirroring ParquetAppender: the file is opened once,
+    lazily on the first row, with a 1 MiB write buffer, instead of an open/close
+    per row. The header is written only for a new or empty file; keys outside `cols`
+    are ignored.
+    """
+
+    __slots__ = ("csv_path", "cols", "_file", "_writer")
+
+    def __init__(self, csv_path: Path, cols: List[str]):
+        self.csv_path = csv_path
+        self.cols = cols
+        self._file: io.TextIOWrapper | None = None
+        self._writer: csv.DictWriter | None = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._file is not None:
+            self._file.close()
+        return False
+
+    def append(self, row: dict):
+        if self._writer is None:
+            self._file = open(
+                self.csv_path, "a", newline="", encoding="utf-8", buffering=1 << 20
+            )
+            self._writer = csv.DictWriter(
+                self._file, fieldnames=self.cols, extrasaction="ignore"
+            )
+            if self._file.tell() == 0:
+                self._writer.writeheader()
+        self._writer.writerow(row)
+
+
 class ParquetAppender:
     """
-    Incremental Parquet writer using pyarrow. Creates the writer lazily on first row.
+    Incremental Parquet writer using pyarrow. Creates the writer lazily on first flush.
+    Rows are buffered and written `batch_rows` at a time, so each row group holds
+    many rows instead of one; the rest is flushed on exit.
+    Every row is written with all of `columns` (default: the keys seen so far),
+    whatever keys the first row had. If a later batch brings a new column, or
+    data for a column that was all-null so far, the file schema is widened and
+    the rows already written are rewritten under it.
+    Pages are written with _PARQUET_WRITE_OPTIONS (zstd level 3).
+    Everything is written to a `.tmp` file next to `parquet_path`, which is
+    moved over it on a clean exit; a killed or failed run leaves the previous
+    output untouched.
     """
 
-    def __init__(self, parquet_path: Path):
+    __slots__ = (
+        "parquet_path",
+        "_tmp_path",
+        "batch_rows",
+        "columns",
+        "_writer",
+        "_schema",
+        "_buffer",
+    )
+
+    def __init__(
+        self,
+        parquet_path: Path,
+        batch_rows: int = 1024,
+        columns: List[str] | None = None,
+    ):
         self.parquet_path = parquet_path
-        self._writer = None
-        self._schema = None
+        self._tmp_path = parquet_path.with_name(parquet_path.name + ".tmp")
+        self.batch_rows = max(1, batch_rows)
+        self.columns = columns
+        self._writer: pq.ParquetWriter | None = None
+        self._schema: pa.Schema | None = None
+        self._buffer: list[dict] = []
 
     def __enter__(self):
         return self
 
     def __exit__(self, exc_type, exc_value, traceback):
-        if self._writer is not None:
-            self._writer.close()
+        # only a run whose body and final flush both succeeded replaces the output
+        ok = False
+        try:
+            if exc_type is None:
+                self._flush()
+                ok = True
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                if ok:
+                    os.replace(self._tmp_path, self.parquet_path)
+                else:
+                    self._tmp_path.unlink(missing_ok=True)
         return False
 
     def append(self, row: dict):
-        table = pa.Table.from_pandas(pd.DataFrame([row]), preserve_index=False)
+        self._buffer.append(row)
+        if len(self._buffer) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        table = self._buffer_to_table()
         if self._writer is None:
+            existing = None
             if self.parquet_path.exists():
                 try:
-                    self.drop_empty_rows_pq()
-                    existing = pq.read_table(self.parquet_path)
-                    self._schema = existing.schema
+                    # the rows are carried over into the new file, so the
+                    # cleaned ones are taken from memory instead of re-read
+                    existing = self.drop_empty_rows_pq(rewrite=False)
                 except Exception as e:
                     logger.warning(
                         f"Could not read existing Parquet file, starting fresh: {e}"
                     )
-                    self._schema = table.schema
-                # Align new table to existing schema (add missing cols, order)
-                table = table_cast_like(table, self._schema)
-                self._writer = pq.ParquetWriter(
-                    self.parquet_path, self._schema, use_dictionary=True
-                )
+            if existing is not None:
+                self._schema = _widen_schema(existing.schema, table.schema)
+                existing = table_cast_like(existing, self._schema)
             else:
                 self._schema = table.schema
-                self._writer = pq.ParquetWriter(
-                    self.parquet_path, self._schema, use_dictionary=True
+            self._writer = pq.ParquetWriter(
+                self._tmp_path, self._schema, **_PARQUET_WRITE_OPTIONS
+            )
+            # the new file replaces the old one on exit, so carry earlier rows over
+            if existing is not None:
+                self._writer.write_table(
+                    existing, row_group_size=PARQUET_ROW_GROUP_ROWS
                 )
+        else:
+            widened = _widen_schema(self._schema, table.schema)
+            if not widened.equals(self._schema):
+                self._rewrite_as(widened)
 
+        # Align new rows to the file schema (add missing cols, order)
         table = table_cast_like(table, self._schema)
-        self._writer.write_table(table)
+        self._writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_ROWS)
+        # cleared only once written, so a failed write keeps the rows
+        self._buffer = []
+
+    def _rewrite_as(self, schema: pa.Schema):
+        """Reopen the output under `schema`, carrying the rows written so far."""
+        self._writer.close()
+        written = table_cast_like(pq.read_table(self._tmp_path), schema)
+        self._schema = schema
+        self._writer = pq.ParquetWriter(
+            self._tmp_path, schema, **_PARQUET_WRITE_OPTIONS
+        )
+        self._writer.write_table(written, row_group_size=PARQUET_ROW_GROUP_ROWS)
+
+    def _buffer_to_table(self) -> pa.Table:
+        names = self.columns or list(dict.fromkeys(chain.from_iterable(self._buffer)))
+        # Once the schema is known, build straight into it so Arrow skips type
+        # inference; a batch with new columns or types is inferred instead
+        if self._schema is not None and set(names).issubset(self._schema.names):
+            try:
+                return pa.Table.from_pylist(self._buffer, schema=self._schema)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError, ValueError):
+                pass
+        # column by column: from_pylist would only keep the first row's keys
+        return pa.table({c: [row.get(c) for row in self._buffer] for c in names})
 
-    def drop_empty_rows_pq(self):
+    def drop_empty_rows_pq(self, rewrite: bool = True) -> pa.Table:
         """
         Arrow-native filter:
         - Keep rows where '__source_file__' is not null/empty.
-        - Drop rows where 'Journal' is numeric (int/float), or a numeric-looking string
-            (e.g., '123', '  12.5  ', '+3e-2'). Null 'Journal' is kept.
+        - Drop rows where 'Journal' is numeric (int/float), a numeric-looking string
+            (e.g., '123', '  12.5  ', '+3e-2'), empty or null, as drop_empty_rows does.
+        Returns the kept rows. The file is rewritten only if `rewrite` is set and
+        rows were actually dropped.
         """
-        table = pq.read_table(self.parquet_path, memory_map=True)
-        mask = None
+        # not memory-mapped: the returned rows outlive a rewrite of the file
+        table = pq.read_table(self.parquet_path)
+        mask = _non_empty_rows_mask(table)
+        if mask is None:
+            return table
+        filtered = table.filter(mask)
+        if not rewrite or filtered.num_rows == table.num_rows:
+            return filtered
+
+        pq.write_table(
+            filtered,
+            self._tmp_path,
+            row_group_size=PARQUET_ROW_GROUP_ROWS,
+            **_PARQUET_WRITE_OPTIONS,
+        )
+        os.replace(self._tmp_path, self.parquet_path)
+        return filtered
 
-        if "__source_file__" in table.column_names:
-            src = table["__source_file__"]
-            mask = pc.and_(pc.is_valid(src), pc.not_equal(src, ""))
 
-        if "Journal" in table.column_names:
-            j = table["Journal"]
-            t = j.type
-            if pat.is_integer(t) or pat.is_floating(t):
-                mask_journal_keep = pc.is_null(j)
-            elif pat.is_string(t) or pat.is_large_string(t):
-                is_numeric_str = pc.match_substring_regex(
-                    j, r"^\s*[+-]?(?:\d+(?:\.\d+)?|\.\d+)(?:[eE][+-]?\d+)?\s*$"
-                )
-                mask_journal_keep = pc.or_(pc.is_null(j), pc.invert(is_numeric_str))
-            else:
-                mask_journal_keep = pc.is_valid(j)
-            mask = (
-                pc.and_(mask, mask_journal_keep)
-                if mask is not None
-                else mask_journal_keep
+def _non_empty_rows_mask(table: pa.Table):
+    """
+    Boolean mask of rows to keep (see ParquetAppender.drop_empty_rows_pq), or
+    None if the table has neither column.
+    """
+    mask = None
+
+    if "__source_file__" in table.column_names:
+        src = table["__source_file__"]
+        mask = pc.and_(pc.is_valid(src), pc.not_equal(src, ""))
+
+    if "Journal" in table.column_names:
+        j = table["Journal"]
+        t = j.type
+        if pat.is_integer(t) or pat.is_floating(t):
+            # every value is either numeric or missing
+            mask_journal_keep = pc.and_(pc.is_valid(j), pa.scalar(False))
+        elif pat.is_string(t) or pat.is_large_string(t):
+            # a missing or empty journal is a PDF whose chunks all failed, so
+            # it is dropped (and retried on resume) like a numeric one
+            is_numeric_str = pc.match_substring_regex(j, _NUMERIC_STR_RE)
+            mask_journal_keep = pc.fill_null(
+                pc.and_(pc.not_equal(j, ""), pc.invert(is_numeric_str)), False
             )
-
-        if mask is not None:
-            filtered = table.filter(mask)
         else:
-            filtered = table
-
-        pq.write_table(
-            filtered,
-            self.parquet_path,
-            use_dictionary=True,
-            compression="zstd",
-            write_statistics=True,
+            mask_journal_keep = pc.is_valid(j)
+        mask = (
+            pc.and_(mask, mask_journal_keep) if mask is not None else mask_journal_keep
         )
+    return mask
+
+
+def _widen_schema(current: pa.Schema, incoming: pa.Schema) -> pa.Schema:
+    """`current` plus incoming's new columns, with all-null columns given a type.
+
+    Incompatible types keep `current`; table_cast_like then casts or raises.
+    """
+    try:
+        return pa.unify_schemas([current, incoming], promote_options="permissive")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return current
+
+
+def _is_null_type(arrow_type) -> bool:
+    """Check if type is null or contains null (e.g., list<item: null>)."""
+    if pa.types.is_null(arrow_type):
+        return True
+    if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
+        return _is_null_type(arrow_type.value_type)
+    return False
 
 
 def table_cast_like(table: pa.Table, target_schema: pa.schema) -> pa.Table:
@@ -256,52 +609,80 @@ def table_cast_like(table: pa.Table, target_schema: pa.schema) -> pa.Table:
     Cast 'table' to 'target_schema' column order and types.
     - Adds any missing columns as null.
     - Drops extra columns not in target schema.
+    - Returns 'table' itself when it already has the target schema.
+    A column whose values can't be cast raises instead of being written as-is.
     """
-
-    def _is_null_type(arrow_type):
-        """Check if type is null or contains null (e.g., list<item: null>)."""
-        if pa.types.is_null(arrow_type):
-            return True
-        if pa.types.is_list(arrow_type) or pa.types.is_large_list(arrow_type):
-            return _is_null_type(arrow_type.value_type)
-        return False
+    if table.schema.equals(target_schema, check_metadata=False):
+        return table
 
     cols = []
     for field in target_schema:
         name = field.name
-        if name in table.column_names:
-            col = table[name]
-            # Check if target type is null (including nested nulls in lists)
-            if _is_null_type(field.type):
-                # If target expects null but source has data, convert to null
-                cols.append(pa.nulls(len(table), type=field.type))
-                continue
-            # Try to cast if needed
-            try:
-                col = col.cast(field.type)
-            except Exception:
-                # Fallback: best effort—let Arrow do implicit cast where possible
-                pass
+        if name not in table.column_names:
+            cols.append(pa.nulls(len(table), type=field.type))
+            continue
+        col = table[name]
+        if col.type.equals(field.type):
             cols.append(col)
-        else:
+        elif _is_null_type(field.type):
+            # If target expects null but source has data, convert to null
             cols.append(pa.nulls(len(table), type=field.type))
+        else:
+            cols.append(col.cast(field.type))
     return pa.table(cols, schema=target_schema)
 
 
-def load_existing_index(csv_path: Path) -> set[str]:
+def load_existing_index(index_path: Path) -> frozenset[str]:
     """
-    When OVERWRITE_MD is False, we skip PDFs already present in the CSV.
-    Uses the '__source_file__' column as the id.
+    When OVERWRITE_MD is False, we skip PDFs already present in the output.
+    Uses the '__source_file__' column as the id. Accepts the Parquet output
+    (rows that drop_empty_rows_pq would remove are ignored) or a CSV (rows
+    that drop_empty_rows would remove are ignored; the file is left as is).
     """
-    if not csv_path.exists():
-        return set()
+    if not index_path.exists():
+        return frozenset()
     try:
-        drop_empty_rows(csv_path)
-        df = pd.read_csv(csv_path, usecols=["__source_file__"])
-        return set(df["__source_file__"].dropna().astype(str).tolist())
+        if index_path.suffix == ".parquet":
+            # one open: the footer gives the schema, then only two columns are read
+            with pq.ParquetFile(index_path, memory_map=True) as pf:
+                names = pf.schema_arrow.names
+                table = pf.read(
+                    columns=[c for c in ("__source_file__", "Journal") if c in names]
+                )
+            mask = _non_empty_rows_mask(table)
+            if mask is not None:
+                table = table.filter(mask)
+            if "__source_file__" not in table.column_names:
+                return frozenset()
+            ids = table["__source_file__"].drop_null().to_pylist()
+            return frozenset(str(x) for x in ids)
+
+        with open(index_path, newline="", encoding="utf-8") as f:
+            header = next(csv.reader(f), [])
+        if "__source_file__" not in header:
+            return frozenset()
+        cols = [c for c in ("__source_file__", "Journal") if c in header]
+        # Arrow's C++ reader parses only these columns, typed up front as
+        # string; empty and NA-like fields come back null, as with pandas
+        table = pacsv.read_csv(
+            index_path,
+            convert_options=pacsv.ConvertOptions(
+                include_columns=cols,
+                column_types={c: pa.string() for c in cols},
+                strings_can_be_null=True,
+            ),
+        )
+        src = table["__source_file__"]
+        keep = pc.is_valid(src)
+        if "Journal" in cols:
+            # drop_empty_rows drops missing and numeric journals alike
+            j = table["Journal"]
+            numeric = pc.fill_null(pc.match_substring_regex(j, _NUMERIC_STR_RE), True)
+            keep = pc.and_(keep, pc.invert(numeric))
+        return frozenset(src.filter(keep).to_pylist())
     except Exception as e:
-        logger.error(f"Error loading existing index from {csv_path}: {e}")
-        return set()
+        logger.error(f"Error loading existing index from {index_path}: {e}")
+        return frozenset()
 
 
 def drop_empty_rows(csv_path: Path):
@@ -310,18 +691,17 @@ def drop_empty_rows(csv_path: Path):
       - NaN in '__source_file__'
       - 'Journal' that is numeric (int-like or float-like)
     """
+    # pandas is only needed for this offline CSV cleanup, so it is not
+    # imported by the pipeline itself
+    import pandas as pd
+
     df = pd.read_csv(csv_path)
     if "__source_file__" in df.columns:
         df = df.dropna(subset=["__source_file__"])
 
     if "Journal" in df.columns:
-
-        def is_numeric(x):
-            try:
-                float(str(x).strip())
-                return True
-            except Exception:
-                return False
-
-        df = df[~df["Journal"].apply(is_numeric)]
+        journal = df["Journal"]
+        # same rule as load_existing_index; a missing value counts as numeric
+        numeric = journal.astype(str).str.match(_NUMERIC_STR_RE)
+        df = df[~(journal.isna() | numeric)]
     df.to_csv(csv_path, index=False)